@@ -1,9 +1,19 @@
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
+from posts.cache import STATIC_SCOPE
+from posts.pagecache import cache_anonymous_page
 
+cache_static_page = method_decorator(
+    cache_anonymous_page(lambda: [STATIC_SCOPE]), name='dispatch'
+)
+
+
+@cache_static_page
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
 
 
+@cache_static_page
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import mail  # noqa: F401
+        from .db import apply_sqlite_pragmas
+        from .perf import instrument_templates
+        instrument_templates()
+        connection_created.connect(apply_sqlite_pragmas)
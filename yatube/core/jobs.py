@@ -0,0 +1,253 @@
+"""Очередь отложенных задач.
+
+Функцию-задачу регистрирует декоратор register, а код ставит её в
+очередь вызовом enqueue(имя, **аргументы). Аргументы должны
+сериализоваться в JSON. Поведение задаёт settings.JOBS_BACKEND:
+- local — в процессе запроса, как без очереди: фоновые задачи после
+  COMMIT в пуле потоков, остальные сразу;
+- db — строка таблицы core_job в той же транзакции, что и данные, а
+  выполняет её python manage.py run_worker: пулом потоков, пачками
+  (batch_size) и с повторами при ошибках.
+
+Задача с batch_size больше единицы получает список аргументов всех
+задач пачки, остальные — аргументы одной задачи. Пакетная задача может
+вернуть словарь {номер в пачке: исключение}: повторяются только эти
+задачи, остальные считаются выполненными.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import perf
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class Task:
+    def __init__(self, name, func, background, batch_size, max_attempts):
+        self.name = name
+        self.func = func
+        self.background = background
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    def __call__(self, payloads):
+        if self.batch_size > 1:
+            return self.func(payloads)
+        for payload in payloads:
+            self.func(**payload)
+
+
+REGISTRY = {}
+
+# Итоги выполнения в этом процессе: имя задачи -> счётчики.
+stats = defaultdict(Counter)
+LOCK = threading.Lock()
+
+_executor = None
+
+
+def register(name, background=False, batch_size=1, max_attempts=3):
+    """Декоратор задачи.
+
+    background — в режиме local выполнять после COMMIT в пуле потоков,
+    а не сразу.
+    """
+    def decorator(func):
+        REGISTRY[name] = Task(
+            name, func, background, batch_size, max_attempts
+        )
+        return func
+    return decorator
+
+
+def _record(name, **counts):
+    with LOCK:
+        stats[name].update(counts)
+
+
+def enqueue(task_name, **payload):
+    task = REGISTRY[task_name]
+    perf.incr('jobs_enqueued')
+    if settings.JOBS_BACKEND == 'db':
+        Job.objects.create(
+            name=task_name, payload=json.dumps(payload, cls=DjangoJSONEncoder)
+        )
+    elif task.background:
+        transaction.on_commit(lambda: _submit_local(task, payload))
+    else:
+        _run_local(task, payload)
+
+
+def _in_memory_db():
+    # In-memory SQLite (тестовая база) не делится между потоками.
+    return connection.vendor == 'sqlite' and connection.is_in_memory_db()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.JOBS_THREADS, thread_name_prefix='jobs'
+        )
+    return _executor
+
+
+def _run_local(task, payload):
+    try:
+        task([payload])
+    except Exception:
+        logger.exception('Задача %s не выполнена', task.name)
+
+
+def _run_local_in_thread(task, payload):
+    try:
+        _run_local(task, payload)
+    finally:
+        # У потока пула своё соединение с БД, его нужно закрыть.
+        connection.close()
+
+
+def _submit_local(task, payload):
+    if _in_memory_db():
+        _run_local(task, payload)
+    else:
+        _get_executor().submit(_run_local_in_thread, task, payload)
+
+
+class Worker:
+    """Выбирает задачи из core_job и выполняет их пачками."""
+
+    def __init__(self, threads=None, limit=100):
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.threads = settings.JOBS_THREADS if threads is None else threads
+        if _in_memory_db():
+            self.threads = 0
+        self.limit = limit
+        self.pool = (
+            ThreadPoolExecutor(self.threads, thread_name_prefix='worker')
+            if self.threads else None
+        )
+
+    def claim(self):
+        now = timezone.now()
+        # Задачи упавшего воркера возвращаются в очередь.
+        Job.objects.filter(
+            status=Job.RUNNING,
+            locked_at__lt=now - timedelta(seconds=settings.JOBS_STALE_AFTER),
+        ).update(status=Job.QUEUED, worker='')
+        ids = list(
+            Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+            .order_by('pk').values_list('pk', flat=True)[:self.limit]
+        )
+        if not ids:
+            return []
+        # Условие по status не даёт двум воркерам взять одну задачу.
+        Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=self.name, locked_at=now
+        )
+        return list(Job.objects.filter(
+            pk__in=ids, status=Job.RUNNING, worker=self.name, locked_at=now
+        ).order_by('pk'))
+
+    def batches(self, jobs):
+        by_name = defaultdict(list)
+        for job in jobs:
+            by_name[job.name].append(job)
+        for name, group in by_name.items():
+            task = REGISTRY.get(name)
+            size = task.batch_size if task else 1
+            for start in range(0, len(group), size):
+                yield task, group[start:start + size]
+
+    def run_once(self):
+        """Выполняет одну выборку задач. Возвращает их число."""
+        jobs = self.claim()
+        batches = list(self.batches(jobs))
+        if self.pool is None:
+            for task, batch in batches:
+                self.execute(task, batch)
+        else:
+            wait([
+                self.pool.submit(self.execute_in_thread, task, batch)
+                for task, batch in batches
+            ])
+        return len(jobs)
+
+    def execute_in_thread(self, task, batch):
+        try:
+            self.execute(task, batch)
+        finally:
+            connection.close()
+
+    def execute(self, task, batch):
+        name = batch[0].name
+        started = time.perf_counter()
+        try:
+            if task is None:
+                raise LookupError(f'Задача {name} не зарегистрирована')
+            # Правки задачи и удаление её строк фиксируются вместе.
+            with transaction.atomic():
+                failed = task([json.loads(job.payload) for job in batch])
+                failed = failed or {}
+                Job.objects.filter(pk__in=[
+                    job.pk for index, job in enumerate(batch)
+                    if index not in failed
+                ]).delete()
+        except Exception as error:
+            logger.exception('Задача %s не выполнена', name)
+            self.retry(task, [(job, error) for job in batch])
+        else:
+            for error in failed.values():
+                logger.error(
+                    'Задача %s не выполнена', name, exc_info=error
+                )
+            if failed:
+                self.retry(task, [
+                    (batch[index], error) for index, error in failed.items()
+                ])
+            _record(name, done=len(batch) - len(failed))
+        finally:
+            _record(
+                name, batches=1, seconds=time.perf_counter() - started
+            )
+
+    def retry(self, task, failures):
+        """Возвращает в очередь или помечает упавшими пары (задача,
+        исключение).
+        """
+        max_attempts = task.max_attempts if task else 1
+        for job, error in failures:
+            job.attempts += 1
+            job.last_error = repr(error)
+            job.worker = ''
+            if job.attempts >= max_attempts:
+                job.status = Job.FAILED
+                _record(job.name, failed=1)
+            else:
+                job.status = Job.QUEUED
+                job.run_after = timezone.now() + timedelta(
+                    seconds=settings.JOBS_RETRY_DELAY
+                    * 2 ** (job.attempts - 1)
+                )
+                _record(job.name, retried=1)
+        Job.objects.bulk_update(
+            [job for job, _ in failures],
+            ['attempts', 'last_error', 'worker', 'status', 'run_after'],
+        )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
@@ -0,0 +1,83 @@
+"""Отправка писем через очередь core.jobs.
+
+QueuedEmailBackend (settings.EMAIL_BACKEND) не связывается с почтовым
+сервером в запросе: каждое письмо ставится задачей core.send_mail, а
+доставляет его бэкенд EMAIL_QUEUE_BACKEND — пачками, по одному
+соединению на пачку. Письма пачки отправляются по одному: отказ
+сервера принять письмо (например, неизвестный адресат) повторяет только
+его задачу. Доставка «хотя бы один раз»: если воркер упадёт посреди
+пачки, уже отправленные письма уйдут повторно.
+"""
+import base64
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from email.message import Message
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+
+from . import jobs
+
+
+class ParsedMessage(MIMEMixin, Message):
+    """Разобранное письмо с as_bytes(linesep=...), как у SafeMIME*."""
+
+
+class QueuedMessage:
+    """Письмо из очереди в готовом MIME-виде.
+
+    Даёт то, что бэкендам Django нужно от EmailMessage.
+    """
+
+    encoding = None
+
+    def __init__(self, from_email, recipients, raw):
+        self.from_email = from_email
+        self._recipients = recipients
+        self._message = message_from_bytes(
+            base64.b64decode(raw), _class=ParsedMessage
+        )
+
+    @property
+    def subject(self):
+        return str(make_header(decode_header(self._message['Subject'])))
+
+    def recipients(self):
+        return self._recipients
+
+    def message(self):
+        return self._message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        count = 0
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            # MIME собирается здесь: вложения и шаблоны уже в памяти.
+            raw = message.message().as_bytes(linesep='\n')
+            jobs.enqueue(
+                'core.send_mail',
+                from_email=message.from_email,
+                recipients=message.recipients(),
+                raw=base64.b64encode(raw).decode(),
+            )
+            count += 1
+        return count
+
+
+@jobs.register('core.send_mail', background=True, batch_size=50,
+               max_attempts=5)
+def deliver(payloads):
+    messages = [QueuedMessage(**payload) for payload in payloads]
+    failed = {}
+    with get_connection(settings.EMAIL_QUEUE_BACKEND) as connection:
+        for index, message in enumerate(messages):
+            try:
+                connection.send_messages([message])
+            except Exception as error:
+                failed[index] = error
+    return failed
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core import jobs
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи очереди core_job (JOBS_BACKEND=db) пулом '
+        'потоков и печатает метрики по задачам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, help='Потоков, по умолчанию JOBS_THREADS.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Задач в одной выборке.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1,
+            help='Пауза, когда очередь пуста, секунд.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        worker = jobs.Worker(options['threads'], options['limit'])
+        self.stdout.write(
+            f'Воркер {worker.name}, потоков: {worker.threads or "нет"}'
+        )
+        try:
+            while True:
+                if worker.run_once():
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+            self.report()
+
+    def report(self):
+        self.stdout.write(
+            f'{"задача":<20} {"готово":>7} {"повтор":>7} {"ошибка":>7} '
+            f'{"пачек":>6} {"мс/задачу":>10}'
+        )
+        for name, counts in sorted(jobs.stats.items()):
+            done = counts['done'] + counts['failed'] + counts['retried']
+            per_job = counts['seconds'] * 1000 / done if done else 0
+            self.stdout.write(
+                f'{name:<20} {counts["done"]:>7} {counts["retried"]:>7} '
+                f'{counts["failed"]:>7} {counts["batches"]:>6} '
+                f'{per_job:>10.2f}'
+            )
+        left = dict(
+            Job.objects.values_list('status').annotate(Count('pk'))
+        )
+        self.stdout.write(
+            'В таблице: ' + ', '.join(
+                f'{status} {left.get(status, 0)}'
+                for status, _ in Job.STATUSES
+            )
+        )
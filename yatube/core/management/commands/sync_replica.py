@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплику (DB_REPLICA_NAME) через '
+        'backup API. С --interval повторяет копию, как асинхронная '
+        'репликация.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to', help='Файл реплики, по умолчанию из DATABASES.'
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые N секунд, пока не прервут.'
+        )
+
+    def handle(self, *args, **options):
+        target = options['to']
+        if target is None and settings.DATABASE_REPLICA:
+            target = settings.DATABASES[settings.DATABASE_REPLICA]['NAME']
+        if target is None:
+            raise CommandError('Задайте DB_REPLICA_NAME или --to.')
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('Копия поддерживается только для SQLite.')
+        while True:
+            self.sync(source, target)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, source, target):
+        if source.in_atomic_block:
+            # backup ждал бы конца собственной транзакции вечно.
+            raise CommandError('Копия невозможна внутри транзакции.')
+        started = time.time_ns()
+        source.ensure_connection()
+        destination = sqlite3.connect(target)
+        try:
+            # Страницы копируются из одного снимка основной базы.
+            source.connection.backup(destination)
+        finally:
+            destination.close()
+        replica.note_sync(started)
+        elapsed = (time.time_ns() - started) / 10 ** 6
+        self.stdout.write(f'Реплика {target} обновлена за {elapsed:.0f} мс')
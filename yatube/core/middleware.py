@@ -0,0 +1,55 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import perf, replica
+
+
+class PerfMiddleware:
+    """Метрики запроса в Server-Timing и в гистограммы представлений.
+
+    Ставится первым в MIDDLEWARE, чтобы замер охватывал остальные.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = perf.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            match = request.resolver_match
+            elapsed = perf.finish(token, match and match.view_name)
+        response['Server-Timing'] = perf.server_timing(metrics, elapsed)
+        return response
+
+
+class ReplicaMiddleware:
+    """Read-your-writes для чтения из реплики (core.replica).
+
+    Ставится сразу после PerfMiddleware, чтобы видеть и запись сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _, token = replica.start(
+            pinned=settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            state = replica.finish(token)
+        if state['wrote'] and settings.DATABASE_REPLICA:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
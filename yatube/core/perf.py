@@ -0,0 +1,203 @@
+"""Метрики производительности запросов.
+
+PerfMiddleware заводит RequestMetrics на время запроса, а код проекта
+добавляет в них время (timer) и события (incr) через функции модуля.
+Вне запроса эти функции ничего не делают. Итоги по каждому
+представлению копятся в histograms этого процесса.
+
+С PERF_TEMPLATE_PROFILE в settings время отрисовки записывается ещё и
+по каждому шаблону и include: сколько раз он рисовался, полное время
+и собственное (без вложенных include).
+"""
+import functools
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.base import Template
+
+# Верхние границы корзин гистограммы, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+_current = ContextVar('perf_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self, profile_templates=False):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.timings = Counter()
+        self.counts = Counter()
+        # Время вложенных шаблонов для каждого рисуемого сейчас шаблона.
+        self.template_stack = []
+        # Имя шаблона -> [отрисовок, полное время, собственное время].
+        self.templates = {} if profile_templates else None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: считает SQL."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.timings['sql'] += time.perf_counter() - started
+
+    def enter_template(self):
+        self.template_stack.append(0.0)
+
+    def exit_template(self, name, elapsed):
+        children = self.template_stack.pop()
+        if self.template_stack:
+            self.template_stack[-1] += elapsed
+        else:
+            self.timings['templates'] += elapsed
+        if self.templates is not None:
+            totals = self.templates.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] += elapsed - children
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.timings = Counter()
+        self.sql_count = 0
+        self.counts = Counter()
+        self.profiled = 0
+        self.templates = {}
+
+    def add(self, metrics, elapsed):
+        self.requests += 1
+        milliseconds = elapsed * 1000
+        index = next(
+            i for i, bound in enumerate(BUCKETS) if milliseconds <= bound
+        )
+        self.buckets[index] += 1
+        self.timings['total'] += elapsed
+        self.timings.update(metrics.timings)
+        self.sql_count += metrics.sql_count
+        self.counts.update(metrics.counts)
+        if metrics.templates is not None:
+            self.profiled += 1
+            for name, values in metrics.templates.items():
+                totals = self.templates.setdefault(name, [0, 0.0, 0.0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+
+    @property
+    def counters(self):
+        # Counter.items не годится для шаблона: {{ counts.items }} == 0.
+        return sorted(self.counts.items())
+
+    @property
+    def means(self):
+        """Среднее время этапов на запрос, мс."""
+        return {
+            name: seconds * 1000 / max(self.requests, 1)
+            for name, seconds in self.timings.items()
+        }
+
+    @property
+    def template_profile(self):
+        """(шаблон, отрисовок, полное мс, собственное мс) на запрос,
+        самые дорогие по собственному времени первыми.
+        """
+        requests = max(self.profiled, 1)
+        rows = [
+            (name, calls / requests, total * 1000 / requests,
+             own * 1000 / requests)
+            for name, (calls, total, own) in self.templates.items()
+        ]
+        return sorted(rows, key=lambda row: -row[3])
+
+
+histograms = {}
+LOCK = threading.Lock()
+
+
+def start():
+    metrics = RequestMetrics(settings.PERF_TEMPLATE_PROFILE)
+    return metrics, _current.set(metrics)
+
+
+def finish(token, view_name):
+    metrics = _current.get()
+    _current.reset(token)
+    elapsed = metrics.elapsed
+    if view_name:
+        with LOCK:
+            histograms.setdefault(view_name, ViewStats()).add(
+                metrics, elapsed
+            )
+    return elapsed
+
+
+def incr(name, value=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.counts[name] += value
+
+
+@contextmanager
+def timer(name):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+
+
+def instrument_templates():
+    """Замеряет Template.render; вложенные include входят во внешний.
+
+    extends не вызывает render родителя, так что время base.html
+    записывается на дочерний шаблон.
+    """
+    render = Template.render
+    if getattr(render, 'instrumented', False):
+        return
+
+    @functools.wraps(render)
+    def timed_render(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, context)
+        metrics.enter_template()
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.exit_template(
+                self.name or '<string>', time.perf_counter() - started
+            )
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+def server_timing(metrics, elapsed):
+    """Значение заголовка Server-Timing."""
+    parts = [f'total;dur={elapsed * 1000:.1f}']
+    parts.append(
+        f'sql;dur={metrics.timings["sql"] * 1000:.1f}'
+        f';desc="{metrics.sql_count} queries"'
+    )
+    for name, seconds in sorted(metrics.timings.items()):
+        if name != 'sql':
+            parts.append(f'{name};dur={seconds * 1000:.1f}')
+    for name, value in sorted(metrics.counts.items()):
+        parts.append(f'{name};desc="{value}"')
+    return ', '.join(parts)
@@ -0,0 +1,131 @@
+"""Чтение из реплики базы.
+
+Представления с read_from_replica читают из settings.DATABASE_REPLICA,
+запись всегда идёт в default. Реплику обновляет команда sync_replica, и
+до следующей копии она отстаёт от основной базы, поэтому:
+- страница читает из реплики, только если копия новее её данных.
+  Иначе страница из реплики попала бы в кэш под версией, уже учитывающей
+  запись. Возраст данных страницы даёт versions у read_from_replica
+  (версии областей posts.cache — время их правки), и запись в чужую
+  ленту страницу не задевает. Без versions нужна копия новее любой
+  записи в ROUTED_APPS, и при постоянной записи такие страницы читают
+  из default;
+- клиент, который сам писал, ещё REPLICA_STICKY_SECONDS читает из
+  default (cookie REPLICA_PIN_COOKIE от ReplicaMiddleware): так он видит
+  свои правки, даже если кэш с отметками недоступен.
+Роутер ведёт только модели ROUTED_APPS. Остальные (сессии, очередь
+задач, таблица DatabaseCache с самими отметками) он отдаёт Django, и
+запись в них не делает копию устаревшей.
+"""
+import time
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+LAST_WRITE_KEY = 'replica:last_write'
+SYNCED_KEY = 'replica:synced'
+# Приложения, чьи данные страницы читают из реплики.
+ROUTED_APPS = {'auth', 'posts'}
+
+_state = ContextVar('replica_state', default=None)
+
+
+def start(pinned):
+    state = {
+        'pinned': pinned, 'wrote': False, 'reading': False, 'fresh': None
+    }
+    return state, _state.set(state)
+
+
+def finish(token):
+    state = _state.get()
+    _state.reset(token)
+    if state['wrote']:
+        note_write()
+    return state
+
+
+def note_write():
+    try:
+        cache.set(LAST_WRITE_KEY, time.time_ns(), None)
+    except DatabaseError:
+        # Таблицы DatabaseCache ещё нет (migrate до createcachetable).
+        # Отметку копии тогда тоже не прочитать, и реплика не в ходу.
+        pass
+
+
+def note_sync(started):
+    """Отметка копии: в реплике всё, что записано до started."""
+    cache.set(SYNCED_KEY, started, None)
+
+
+def synced_at():
+    return cache.get(SYNCED_KEY, 0)
+
+
+def is_fresh():
+    stamps = cache.get_many([LAST_WRITE_KEY, SYNCED_KEY])
+    return stamps.get(SYNCED_KEY, 0) > stamps.get(LAST_WRITE_KEY, 0)
+
+
+def read_from_replica(view=None, *, versions=None):
+    """Декоратор представления, которое только читает.
+
+    versions получает аргументы представления и возвращает время
+    последней правки данных страницы в наносекундах (список) или None,
+    если оно неизвестно.
+    """
+    if view is None:
+        return partial(read_from_replica, versions=versions)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        if versions and settings.DATABASE_REPLICA and not state['pinned']:
+            # Запросы versions ещё идут в default.
+            stamps = versions(request, *args, **kwargs)
+            if stamps:
+                state['fresh'] = synced_at() > max(stamps)
+        state['reading'] = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state['reading'] = False
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        state = _state.get()
+        alias = settings.DATABASE_REPLICA
+        if not (alias and state and state['reading']) or state['pinned']:
+            return None
+        if state['fresh'] is None:
+            state['fresh'] = is_fresh()
+        return alias if state['fresh'] else None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in ROUTED_APPS:
+            return None
+        state = _state.get()
+        if state is None:
+            # Команды и фоновые потоки: отметка до COMMIT, но копию
+            # после них всё равно делают отдельно.
+            note_write()
+        else:
+            # Отметку ставит finish, когда транзакции запроса закрыты.
+            state['wrote'] = state['pinned'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != settings.DATABASE_REPLICA
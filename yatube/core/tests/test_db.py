@@ -0,0 +1,28 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.db import apply_sqlite_pragmas
+
+
+class SqliteTuningTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_pragmas_applied(self):
+        """Каждое новое соединение получает PRAGMA из настроек."""
+        apply_sqlite_pragmas(None, connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+    def test_bench_sqlite(self):
+        """bench_sqlite сравнивает оба профиля."""
+        out = StringIO()
+        call_command(
+            'bench_sqlite', '--seconds', '0.2', '--rows', '100',
+            '--readers', '2', '--writers', '1', stdout=out,
+        )
+        for profile in ('default', 'tuned'):
+            with self.subTest(profile=profile):
+                self.assertIn(profile, out.getvalue())
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+from posts.models import Comment, Post, User, UserStats
+
+calls = []
+
+
+@jobs.register('tests.flaky', max_attempts=2)
+def flaky(fail):
+    calls.append(fail)
+    if fail:
+        raise RuntimeError('сбой')
+
+
+@override_settings(JOBS_BACKEND='db')
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        # Сдвиги счётчиков от setUpTestData.
+        Job.objects.all().delete()
+        cache.clear()
+        calls.clear()
+        jobs.stats.clear()
+        self.worker = jobs.Worker()
+
+    def test_counters_are_deferred_and_batched(self):
+        """Сдвиги счётчиков ждут воркера и применяются одной пачкой."""
+        for number in range(3):
+            Comment.objects.create(
+                post=JobQueueTests.post, author=JobQueueTests.author,
+                text=f'Комментарий {number}',
+            )
+        self.assertEqual(Job.objects.filter(name='posts.counters').count(), 3)
+        JobQueueTests.post.refresh_from_db()
+        self.assertEqual(JobQueueTests.post.comments_count, 0)
+        self.assertEqual(self.worker.run_once(), 3)
+        JobQueueTests.post.refresh_from_db()
+        self.assertEqual(JobQueueTests.post.comments_count, 3)
+        stats = UserStats.objects.get(user=JobQueueTests.author)
+        self.assertEqual(stats.comments_count, 3)
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(jobs.stats['posts.counters']['batches'], 1)
+
+    def test_cached_post_page_shows_applied_count(self):
+        """Гостевая страница поста видит счётчик, применённый воркером."""
+        Comment.objects.create(
+            post=JobQueueTests.post, author=User.objects.create_user(
+                username='Reader'
+            ), text='Комментарий',
+        )
+        url = reverse('posts:post_detail', args=[JobQueueTests.post.pk])
+        self.assertContains(Client().get(url), 'Комментариев: 0')
+        self.worker.run_once()
+        self.assertContains(Client().get(url), 'Комментариев: 1')
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        """Упавшая задача повторяется позже, а после max_attempts
+        остаётся в таблице с ошибкой.
+        """
+        jobs.enqueue('tests.flaky', fail=True)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.worker.run_once()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(self.worker.run_once(), 0)
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('сбой', job.last_error)
+        self.assertEqual(calls, [True, True])
+
+    def test_stale_running_job_is_requeued(self):
+        """Задача упавшего воркера возвращается в очередь."""
+        jobs.enqueue('tests.flaky', fail=False)
+        Job.objects.update(
+            status=Job.RUNNING, worker='old',
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(calls, [False])
+
+    def test_run_worker_once(self):
+        """run_worker --once разбирает очередь и печатает метрики."""
+        jobs.enqueue('tests.flaky', fail=False)
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('tests.flaky', out.getvalue())
+
+
+class LocalBackendTests(TestCase):
+    def test_local_backend_runs_immediately(self):
+        """Без воркера задачи выполняются в процессе, таблица пуста."""
+        calls.clear()
+        jobs.enqueue('tests.flaky', fail=False)
+        self.assertEqual(calls, [False])
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,146 @@
+import os
+import socketserver
+import tempfile
+import threading
+
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+from posts.models import User
+
+
+class SMTPStandIn(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает всё и запоминает письма."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                body = b''.join(iter(self.rfile.readline, b'.\r\n'))
+                self.server.messages.append(body)
+                self.reply('250 OK')
+            elif command.startswith('RCPT TO') and 'REJECTED' in command:
+                self.reply('550 No such user')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend', JOBS_BACKEND='db'
+)
+class QueuedEmailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}', password='Pa55word!',
+                email=f'user{number}@example.com',
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        Job.objects.all().delete()
+
+    def reset_passwords(self):
+        client = Client()
+        for user in QueuedEmailTests.users:
+            client.post(
+                reverse('users:password_reset_form'), {'email': user.email}
+            )
+
+    def deliver(self):
+        worker = jobs.Worker()
+        self.addCleanup(worker.close)
+        return worker.run_once()
+
+    @override_settings(
+        EMAIL_QUEUE_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_reset_mail_is_queued(self):
+        """Сброс пароля ставит письмо в очередь, а не отправляет его."""
+        self.reset_passwords()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.filter(name='core.send_mail').count(), 3)
+        self.assertEqual(self.deliver(), 3)
+        self.assertEqual(
+            sorted(message.recipients() for message in mail.outbox),
+            [[user.email] for user in QueuedEmailTests.users],
+        )
+        self.assertIn('testserver', mail.outbox[0].subject)
+
+    def test_file_backend_delivery(self):
+        """Файловый бэкенд получает письмо целиком."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                EMAIL_QUEUE_BACKEND=(
+                    'django.core.mail.backends.filebased.EmailBackend'
+                ),
+                EMAIL_FILE_PATH=directory,
+            ):
+                mail.send_mail(
+                    'Тема письма', 'Текст письма', 'from@example.com',
+                    ['to@example.com'],
+                )
+                self.deliver()
+            (name,) = os.listdir(directory)
+            with open(os.path.join(directory, name)) as file:
+                content = file.read()
+        self.assertIn('To: to@example.com', content)
+        self.assertIn('Текст письма', content)
+
+    def start_smtp(self):
+        server = socketserver.ThreadingTCPServer(
+            ('localhost', 0), SMTPStandIn
+        )
+        server.daemon_threads = True
+        server.connections, server.messages = 0, []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return override_settings(
+            EMAIL_QUEUE_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='localhost',
+            EMAIL_PORT=server.server_address[1],
+        ), server
+
+    def test_smtp_connection_is_reused(self):
+        """Пачка писем уходит через одно SMTP-соединение."""
+        smtp_settings, server = self.start_smtp()
+        with smtp_settings:
+            self.reset_passwords()
+            self.deliver()
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 3)
+        self.assertFalse(Job.objects.exists())
+
+    def test_rejected_recipient_retries_only_its_message(self):
+        """Отказ одному адресату не мешает остальным письмам пачки."""
+        smtp_settings, server = self.start_smtp()
+        recipients = ['first@example.com', 'rejected@example.com',
+                      'last@example.com']
+        with smtp_settings:
+            for recipient in recipients:
+                mail.send_mail(
+                    'Тема', 'Текст', 'from@example.com', [recipient]
+                )
+            with self.assertLogs('core.jobs', 'ERROR'):
+                self.deliver()
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 2)
+        job = Job.objects.get()
+        self.assertIn('rejected@example.com', job.payload)
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('SMTPRecipientsRefused', job.last_error)
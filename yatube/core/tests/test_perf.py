@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import perf
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PerfMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        perf.histograms.clear()
+        self.guest_client = Client()
+
+    def test_server_timing(self):
+        """Ответ несёт время SQL, шаблонов и промахи кэша лент."""
+        response = self.guest_client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for part in ('total;dur=', 'sql;dur=', 'templates;dur=',
+                     'cache_misses;desc="1"'):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    def test_histogram_per_view(self):
+        """Запросы копятся в гистограмме своего представления."""
+        for _ in range(2):
+            self.guest_client.get(reverse('posts:index'))
+        stats = perf.histograms['posts:index']
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(sum(stats.buckets), 2)
+        self.assertEqual(stats.counts['page_cache_hits'], 1)
+
+    @override_settings(PERF_TEMPLATE_PROFILE=True)
+    def test_template_profile(self):
+        """Профилирование пишет время каждого шаблона и include."""
+        Post.objects.bulk_create(
+            Post(author=PerfMiddlewareTest.admin, text=f'Пост {i}')
+            for i in range(3)
+        )
+        self.guest_client.get(reverse('posts:index'))
+        profile = {
+            name: (calls, total, own)
+            for name, calls, total, own
+            in perf.histograms['posts:index'].template_profile
+        }
+        calls, total, own = profile['includes/post.html']
+        self.assertEqual(calls, 3)
+        self.assertLessEqual(own, total)
+        self.assertIn('posts/index.html', profile)
+
+    def test_profile_templates_command(self):
+        """profile_templates печатает таблицу шаблонов страницы."""
+        out = StringIO()
+        call_command(
+            'profile_templates', reverse('posts:index'), '--requests', '2',
+            stdout=out,
+        )
+        self.assertIn('posts/index.html', out.getvalue())
+
+    def test_stats_page_is_admin_only(self):
+        """Страница метрик доступна только персоналу."""
+        url = reverse('perf_stats')
+        response = self.guest_client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("admin:login")}?next={url}'
+        )
+        admin_client = Client()
+        admin_client.force_login(PerfMiddlewareTest.admin)
+        self.guest_client.get(reverse('posts:index'))
+        response = admin_client.get(url)
+        self.assertContains(response, 'posts:index')
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core import replica
+from core.replica import ReplicaRouter
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.state, token = replica.start(pinned=False)
+        self.addCleanup(replica._state.reset, token)
+        self.state['reading'] = True
+
+    def test_fresh_replica_serves_reads(self):
+        """Догнавшая реплика отвечает на чтения, запись — в default."""
+        replica.note_sync(time.time_ns())
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_lagging_replica_is_skipped(self):
+        """После записи без новой копии читаем из default."""
+        replica.note_sync(time.time_ns())
+        replica.note_write()
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_pinned_client_reads_primary(self):
+        """Клиент с cookie после своей записи читает из default."""
+        replica.note_sync(time.time_ns())
+        self.state['pinned'] = True
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_other_apps_are_not_routed(self):
+        """Сессии и задачи не трогают отметок и читаются из default."""
+        replica.note_sync(time.time_ns())
+        self.assertIsNone(self.router.db_for_write(Session))
+        self.assertFalse(self.state['wrote'])
+        self.assertIsNone(self.router.db_for_read(Session))
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_page_data_older_than_copy(self):
+        """Страница читает из реплики, если копия новее её данных."""
+        replica.note_sync(time.time_ns())
+        replica.note_write()
+        page = replica.read_from_replica(
+            versions=lambda request: [replica.synced_at() - 1]
+        )(lambda request: self.router.db_for_read(Post))
+        self.state['reading'] = False
+        self.assertEqual(page(None), 'replica')
+        self.state['fresh'] = None
+        stale = replica.read_from_replica(
+            versions=lambda request: [time.time_ns()]
+        )(lambda request: self.router.db_for_read(Post))
+        self.assertIsNone(stale(None))
+
+
+class ReplicaMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Writer')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @override_settings(
+        DATABASE_REPLICA='default',
+        DATABASE_ROUTERS=['core.replica.ReplicaRouter'],
+    )
+    def test_writer_is_pinned(self):
+        """Писавший клиент получает cookie чтения из основной базы."""
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn('primary', response.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('primary', response.cookies)
+
+
+@override_settings(
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    }},
+    DATABASE_ROUTERS=['core.replica.ReplicaRouter'],
+)
+class DatabaseCacheTests(TransactionTestCase):
+    """Кэш в базе: роутер не зацикливается на таблице кэша."""
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+
+    def test_requests_and_sync(self):
+        user = User.objects.create_user(username='Writer')
+        client = Client()
+        client.force_login(user)
+        response = client.post(
+            reverse('posts:post_create'), {'text': 'Пост'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(replica.is_fresh())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            call_command('sync_replica', '--to', path, stdout=StringIO())
+        self.assertTrue(replica.is_fresh())
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Пост')
+
+
+class SyncReplicaTests(TransactionTestCase):
+    def test_sync_replica(self):
+        """sync_replica копирует основную базу в файл реплики."""
+        Post.objects.create(
+            author=User.objects.create_user(username='Writer'), text='Пост'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            call_command('sync_replica', '--to', path, stdout=StringIO())
+            db = sqlite3.connect(path)
+            count = db.execute('SELECT COUNT(*) FROM posts_post').fetchone()
+            db.close()
+        self.assertEqual(count[0], 1)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+
+
+def get_upload_errors(request):
+    """Ошибки файлов, отброшенных при разборе запроса."""
+    return getattr(request, 'upload_errors', {})
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Отбрасывает файлы больше FILE_UPLOAD_MAX_SIZE, не дочитывая их.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: следующие обработчики получают
+    поток по частям и не успевают сохранить лишнее. Причина отказа
+    записывается в request.upload_errors, чтобы форма могла её показать.
+    """
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 *args, **kwargs):
+        super().new_file(
+            field_name, file_name, content_type, content_length,
+            *args, **kwargs
+        )
+        if content_length is not None:
+            self.check_size(content_length)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.check_size(start + len(raw_data))
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def check_size(self, size):
+        limit = settings.FILE_UPLOAD_MAX_SIZE
+        if size <= limit:
+            return
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = (
+            f'Файл больше {filesizeformat(limit)}.'
+        )
+        raise SkipFile
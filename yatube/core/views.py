@@ -1,5 +1,8 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from . import perf
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +18,14 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def perf_stats(request):
+    """Гистограммы времени ответа представлений в этом процессе."""
+    with perf.LOCK:
+        views = sorted(perf.histograms.items())
+    return render(request, 'core/perf.html', {
+        'views': views,
+        'buckets': perf.BUCKETS,
+    })
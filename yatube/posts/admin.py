@@ -1,6 +1,10 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import SearchResults
+
+# Админка показывает лучшие совпадения, а не всю выдачу.
+SEARCH_LIMIT = 500
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,6 +20,14 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск через индекс вместо icontains по всей таблице."""
+        results = SearchResults(search_term)
+        if not results.terms:
+            return queryset, False
+        ids = results.engine.search(results.terms, 0, SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import detect_fts_table, redetect_fts_table
+        connection_created.connect(detect_fts_table)
+        post_migrate.connect(redetect_fts_table, sender=self)
@@ -0,0 +1,170 @@
+"""Кэш страниц лент.
+
+Страница ленты хранится под ключом из области (лента всех постов,
+группы или автора), текущих версий области и параметров пагинации;
+посты в ней — байты снимков posts.snapshots.
+Сигналы Post и Group меняют версии затронутых областей, после чего
+старые ключи просто перестают читаться и вытесняются по таймауту.
+Из тех же версий строятся ETag страниц (posts.conditional) и ключи
+готовых гостевых ответов (posts.pagecache); для них есть ещё области
+поста и счётчиков пользователя. Карточки постов (posts.cards) хранят
+версии, при которых нарисованы, прямо в значении.
+
+Схема ключей (поверх KEY_PREFIX и VERSION из settings.CACHES):
+    feed:v<SCHEMA>:version:<область>
+    feed:v<SCHEMA>:page:<область>:<версии областей>:<md5 параметров>
+    feed:v<SCHEMA>:response:<версии областей>:<md5 адреса>
+    feed:v<SCHEMA>:card:<id поста>:<без группы 0/1>
+    feed:v<SCHEMA>:follows:<id пользователя>
+SCHEMA меняется вместе с форматом закэшированного значения.
+"""
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import perf
+
+SCHEMA = 2
+INDEX_SCOPE = 'index'
+# Данные чужих моделей в карточке поста: названия групп, имена авторов.
+RELATED_SCOPE = 'related'
+# Страницы без данных базы (about). Меняются только с выкладкой.
+STATIC_SCOPE = 'static'
+
+# Попадания и промахи страниц лент в этом процессе.
+stats = Counter()
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def stats_scope(user_id):
+    return f'stats:{user_id}'
+
+
+def card_scope(post_id):
+    return f'card:{post_id}'
+
+
+def follows_scope(user_id):
+    return f'follows:{user_id}'
+
+
+def request_scopes(request, get_scopes, args, kwargs):
+    """Области страницы; get_scopes ходит в базу один раз на запрос,
+    сколько бы декораторов их ни спрашивали.
+    """
+    if not hasattr(request, '_feed_scopes'):
+        request._feed_scopes = get_scopes(*args, **kwargs)
+    return request._feed_scopes
+
+
+def replica_versions(get_scopes):
+    """versions для core.replica.read_from_replica: версии областей
+    страницы, данных карточек и подписок читателя.
+    """
+    def versions(request, *args, **kwargs):
+        scopes = request_scopes(request, get_scopes, args, kwargs)
+        if scopes is None:
+            return None
+        scopes = [*scopes, RELATED_SCOPE]
+        if request.user.is_authenticated:
+            scopes.append(follows_scope(request.user.pk))
+        return get_versions(scopes)
+    return versions
+
+
+def _version_key(scope):
+    return f'feed:v{SCHEMA}:version:{scope}'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def get_many_with_versions(keys, scopes):
+    """Значения keys и версии scopes одним походом в кэш.
+
+    Возвращает словарь найденных значений и список версий.
+    """
+    version_keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many([*keys, *version_keys])
+    missing = [key for key in version_keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_version(), None)
+        found.update(cache.get_many(missing))
+    values = {key: found[key] for key in keys if key in found}
+    return values, [found.get(key, 0) for key in version_keys]
+
+
+def get_versions(scopes):
+    return get_many_with_versions([], scopes)[1]
+
+
+def _set_versions(scopes):
+    cache.set_many(
+        {_version_key(scope): _new_version() for scope in scopes}, None
+    )
+
+
+def bump(*scopes):
+    """Инвалидирует все закэшированные страницы областей.
+
+    Внутри транзакции версии меняются сразу и ещё раз после COMMIT:
+    страница, которую другой запрос успел закэшировать по старым
+    данным между этими моментами, осталась под промежуточной версией
+    и больше не читается.
+    """
+    _set_versions(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _set_versions(scopes))
+
+
+def page_key(scope, params):
+    versions = ':'.join(map(str, get_versions([scope, RELATED_SCOPE])))
+    digest = hashlib.md5(params.encode()).hexdigest()
+    return f'feed:v{SCHEMA}:page:{scope}:{versions}:{digest}'
+
+
+def get_page(key):
+    value = cache.get(key)
+    outcome = 'hits' if value is not None else 'misses'
+    stats[outcome] += 1
+    perf.incr(f'cache_{outcome}')
+    return value
+
+
+def set_page(key, value):
+    cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+
+
+def response_key(scopes, url):
+    versions = ':'.join(map(str, get_versions(scopes)))
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'feed:v{SCHEMA}:response:{versions}:{digest}'
+
+
+def card_key(post_id, hidden_group):
+    return f'feed:v{SCHEMA}:card:{post_id}:{int(hidden_group)}'
+
+
+def set_cards(values):
+    cache.set_many(values, settings.FEED_CACHE_TIMEOUT)
+
+
+def follows_key(user_id):
+    return f'feed:v{SCHEMA}:follows:{user_id}'
@@ -0,0 +1,50 @@
+"""Кэш отрисованных карточек постов (includes/post.html).
+
+Карточка одинакова для всех пользователей и меняется редко, а рисовать
+её дорого: поиск миниатюры и linebreaksbr по всему тексту. Она хранится
+под ключом из id поста вместе с версиями, при которых нарисована:
+области карточки (правка поста) и RELATED (переименование группы, смена
+имени автора). Ключи всех карточек страницы и версии читаются одним
+get_many.
+"""
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import perf
+
+from . import cache as feed_cache
+from . import pagecache
+
+TEMPLATE = 'includes/post.html'
+
+
+def render_cards(posts, hidden_group=False):
+    """HTML карточек постов в исходном порядке."""
+    posts = list(posts)
+    keys = [feed_cache.card_key(post.pk, hidden_group) for post in posts]
+    cached, versions = feed_cache.get_many_with_versions(keys, [
+        *(feed_cache.card_scope(post.pk) for post in posts),
+        feed_cache.RELATED_SCOPE,
+    ])
+    related = versions.pop()
+    cards, fresh, misses = [], {}, 0
+    for post, key, version in zip(posts, keys, versions):
+        stamp = (version, related)
+        entry = cached.get(key)
+        if entry is not None and entry[0] == stamp:
+            cards.append(entry[1])
+            continue
+        misses += 1
+        # Карточку с оригиналом вместо не готовой миниатюры не храним.
+        with pagecache.fragment() as state:
+            html = render_to_string(
+                TEMPLATE, {'post': post, 'hidden_group': hidden_group}
+            )
+        if not state['skip']:
+            fresh[key] = (stamp, str(html))
+        cards.append(html)
+    if fresh:
+        feed_cache.set_cards(fresh)
+    perf.incr('card_hits', len(posts) - misses)
+    perf.incr('card_misses', misses)
+    return [mark_safe(card) for card in cards]
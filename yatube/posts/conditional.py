@@ -0,0 +1,73 @@
+"""Условные GET-запросы для лент и страницы поста.
+
+ETag и Last-Modified считаются из версий областей кэша (posts.cache),
+которые сигналы меняют при любой правке данных страницы. Поэтому
+ответ 304 отдаётся без обращения к шаблонам и почти без SQL.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+    quote_etag
+)
+from django.utils.http import http_date
+
+from . import cache as feed_cache
+
+
+def _etag(request, versions):
+    # Страница зависит от пользователя (шапка, кнопки подписки) и
+    # содержит CSRF-токен формы, который годен только с его cookie.
+    parts = [
+        settings.CACHES['default'].get('VERSION', 1),
+        *versions,
+        request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ]
+    return quote_etag(
+        hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    )
+
+
+def conditional(get_scopes):
+    """Декоратор представления.
+
+    get_scopes получает аргументы представления и возвращает области
+    кэша страницы или None, если объекта нет (тогда отвечает само
+    представление, например 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = feed_cache.request_scopes(
+                request, get_scopes, args, kwargs
+            )
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            versions = feed_cache.get_versions(
+                [*scopes, feed_cache.RELATED_SCOPE]
+            )
+            etag = _etag(request, versions)
+            # Версии — время изменения в наносекундах.
+            last_modified = max(versions) // 10 ** 9
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response['ETag'] = etag
+                    response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ['Cookie'])
+            # Гостевые страницы может хранить и общий прокси, но каждый
+            # раз сверяя их с сервером.
+            patch_cache_control(response, no_cache=True)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,8 @@
+from .follows import get_follows
+
+
+def follows(request):
+    """Подписки пользователя; загружаются при первой проверке в шаблоне."""
+    return {
+        'follows': get_follows(request),
+    }
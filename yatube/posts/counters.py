@@ -0,0 +1,161 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Сдвиги счётчиков ставятся в очередь core.jobs (schedule) и
+применяются пачками: сдвиги одного пользователя или поста из многих
+задач сводятся, а пользователи с одинаковым итоговым сдвигом
+обновляются одним UPDATE.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from core import jobs
+
+from . import cache as feed_cache
+from .models import Comment, Follow, Post, User, UserStats
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'comments_count': (Comment, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _count(model, field):
+    """Подзапрос COUNT(*) строк model, ссылающихся на внешний pk."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def _shift(delta):
+    return {
+        field: Greatest(F(field) + value, 0)
+        for field, value in delta.items()
+    }
+
+
+def change_users(user_ids, **delta):
+    """Сдвигает счётчики нескольких пользователей одним UPDATE.
+
+    Строку UserStats без строки не создаёт: её пересчитает get_stats при
+    чтении. Иначе удаление пользователя, чья строка уже удалена каскадом,
+    создавало бы её заново перед удалением самого пользователя.
+    """
+    UserStats.objects.filter(user_id__in=user_ids).update(**_shift(delta))
+
+
+def change_posts(post_ids, **delta):
+    Post.objects.filter(pk__in=post_ids).update(**_shift(delta))
+
+
+def schedule(users=(), posts=(), recount=()):
+    """Ставит сдвиги в очередь.
+
+    users — тройки (id пользователя, поле, сдвиг),
+    posts — пары (id поста, сдвиг комментариев),
+    recount — id пользователей, чьи счётчики нужно пересчитать.
+    """
+    jobs.enqueue(
+        'posts.counters',
+        users=[list(change) for change in users],
+        posts=[list(change) for change in posts],
+        recount=list(recount),
+    )
+
+
+def _group_by_delta(deltas):
+    groups = defaultdict(list)
+    for pk, delta in deltas.items():
+        delta = tuple(sorted(
+            (field, value) for field, value in delta.items() if value
+        ))
+        if delta:
+            groups[delta].append(pk)
+    return groups
+
+
+@jobs.register('posts.counters', batch_size=200)
+def apply_changes(payloads):
+    """Применяет сдвиги пачки задач schedule."""
+    users, posts = defaultdict(Counter), defaultdict(Counter)
+    for payload in payloads:
+        for user_id, field, delta in payload['users']:
+            users[user_id][field] += delta
+        for post_id, delta in payload['posts']:
+            posts[post_id]['comments_count'] += delta
+    recount = {
+        user_id for payload in payloads for user_id in payload['recount']
+    }
+    if recount:
+        # Пересчёт уже учитывает строки задач пачки, их сдвиги лишние.
+        # Сдвиги из ещё не выбранных задач задвоятся; это редкий случай
+        # (повторные подписки), расхождение сверит recount_counters.
+        recount_users(recount)
+    for delta, user_ids in _group_by_delta(users).items():
+        user_ids = [user_id for user_id in user_ids if user_id not in recount]
+        if user_ids:
+            change_users(user_ids, **dict(delta))
+    for delta, post_ids in _group_by_delta(posts).items():
+        change_posts(post_ids, **dict(delta))
+    feed_cache.bump(
+        *map(feed_cache.stats_scope, recount.union(users)),
+        *map(feed_cache.post_scope, posts),
+    )
+
+
+def get_stats(user):
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        recount_users([user.pk])
+        return UserStats.objects.get(user=user)
+
+
+def recount_users(user_ids=None):
+    """Сверяет счётчики пользователей с таблицами.
+
+    Возвращает число исправленных записей.
+    """
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    actual = users.annotate(**{
+        field: _count(model, related)
+        for field, (model, related) in USER_COUNTERS.items()
+    }).values('pk', *USER_COUNTERS)
+    stored = UserStats.objects.in_bulk(
+        [row['pk'] for row in actual], field_name='user_id'
+    )
+    missing, drifted = [], []
+    for row in actual:
+        user_id = row.pop('pk')
+        stats = stored.get(user_id)
+        if stats is None:
+            missing.append(UserStats(user_id=user_id, **row))
+        elif any(getattr(stats, key) != value for key, value in row.items()):
+            for key, value in row.items():
+                setattr(stats, key, value)
+            drifted.append(stats)
+    UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+    UserStats.objects.bulk_update(drifted, list(USER_COUNTERS))
+    return len(missing) + len(drifted)
+
+
+def recount_posts():
+    """Сверяет Post.comments_count. Возвращает число исправленных постов."""
+    drifted = Post.objects.annotate(
+        actual=_count(Comment, 'post')
+    ).exclude(comments_count=F('actual'))
+    return Post.objects.filter(
+        pk__in=list(drifted.values_list('pk', flat=True))
+    ).update(comments_count=_count(Comment, 'post'))
@@ -0,0 +1,160 @@
+"""Подписки: проверка и запись.
+
+FollowSet загружает id всех авторов, на которых подписан пользователь,
+при первой проверке и отвечает на следующие за O(1). Набор хранится в
+кэше вместе с версией области подписок пользователя, которую сигналы
+Follow меняют при подписке и отписке; значение и версия читаются одним
+get_many.
+
+follow_many и unfollow меняют подписки одной командой SQL, которая не
+падает на гонке двух одинаковых запросов (INSERT с пропуском
+конфликтов и DELETE по условию). Сигналы Follow при этом не посылаются:
+счётчики, области кэша и ленты обновляются здесь же, пачкой.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+
+from . import cache as feed_cache
+from . import counters, timelines
+from .models import Follow, User
+
+
+def followed_author_ids(user_id):
+    key = feed_cache.follows_key(user_id)
+    cached, (version,) = feed_cache.get_many_with_versions(
+        [key], [feed_cache.follows_scope(user_id)]
+    )
+    entry = cached.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    ids = frozenset(
+        Follow.objects.filter(user_id=user_id)
+        .values_list('author_id', flat=True)
+    )
+    cache.set(key, (version, ids), settings.FEED_CACHE_TIMEOUT)
+    return ids
+
+
+class FollowSet:
+    """Авторы, на которых подписан пользователь.
+
+    Проверка принимает пользователя или его id: {% if author in follows %}.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = (
+                followed_author_ids(self.user.pk)
+                if self.user.is_authenticated else frozenset()
+            )
+        return self._ids
+
+    def __contains__(self, author):
+        return getattr(author, 'pk', author) in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def get_follows(request):
+    """FollowSet запроса: один на все проверки представления и шаблонов."""
+    if not hasattr(request, '_follows'):
+        request._follows = FollowSet(request.user)
+    return request._follows
+
+
+def _write_connection():
+    # Через роутер, чтобы запись закрепила клиента за основной базой.
+    return connections[router.db_for_write(Follow)]
+
+
+def _insert_follows(user_id, author_ids):
+    """Подписки на существующих авторов, кроме самого user_id.
+
+    Возвращает число действительно созданных строк.
+    """
+    connection = _write_connection()
+    ops = connection.ops
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{ops.quote_name(Follow._meta.db_table)} (user_id, author_id) '
+        f'SELECT %s, id FROM {ops.quote_name(User._meta.db_table)} '
+        f'WHERE id IN ({placeholders}) AND id <> %s '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *author_ids, user_id])
+        return cursor.rowcount
+
+
+def _delete_follow(user_id, author_id):
+    connection = _write_connection()
+    sql = (
+        f'DELETE FROM {connection.ops.quote_name(Follow._meta.db_table)} '
+        f'WHERE user_id = %s AND author_id = %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, author_id])
+        return cursor.rowcount
+
+
+def _changed(user_id, author_ids):
+    feed_cache.bump(
+        feed_cache.follows_scope(user_id),
+        feed_cache.stats_scope(user_id),
+        *(feed_cache.stats_scope(author_id) for author_id in author_ids),
+    )
+
+
+@transaction.atomic
+def follow_many(user, authors):
+    """Подписывает user на авторов (пользователей или id) одной вставкой.
+
+    Уже существующие подписки, несуществующие id и сам user
+    пропускаются. Возвращает число новых подписок.
+    """
+    author_ids = sorted({getattr(author, 'pk', author) for author in authors})
+    if not author_ids:
+        return 0
+    created = _insert_follows(user.pk, author_ids)
+    if not created:
+        return 0
+    if created == len(author_ids):
+        counters.schedule(users=[
+            (user.pk, 'following_count', created),
+            *((author_id, 'followers_count', 1) for author_id in author_ids),
+        ])
+    else:
+        # Какие строки вставлены, неизвестно: пересчитываем честно.
+        counters.schedule(recount=[user.pk, *author_ids])
+    if settings.FOLLOW_TIMELINE:
+        timelines.backfill(user.pk, author_ids)
+    _changed(user.pk, author_ids)
+    return created
+
+
+def follow(user, author):
+    """Подписка одной командой; повторная не ошибка. True — создана."""
+    return follow_many(user, [author]) == 1
+
+
+@transaction.atomic
+def unfollow(user, author):
+    """Отписка одной командой; повторная не ошибка. True — удалена."""
+    author_id = getattr(author, 'pk', author)
+    if not _delete_follow(user.pk, author_id):
+        return False
+    counters.schedule(users=[
+        (user.pk, 'following_count', -1), (author_id, 'followers_count', -1)
+    ])
+    if settings.FOLLOW_TIMELINE:
+        timelines.prune(user.pk, author_id)
+    _changed(user.pk, [author_id])
+    return True
@@ -0,0 +1,140 @@
+"""Миниатюры картинок постов.
+
+Миниатюры всех геометрий из POST_THUMBNAILS готовятся фоновой задачей
+core.jobs после сохранения поста. Шаблоны только спрашивают хранилище
+sorl, готова ли миниатюра, и до этого показывают оригинал, поэтому
+запрос никогда не ждёт Pillow.
+
+Загруженные оригиналы проверяются по заголовку и при необходимости
+перекодируются: без EXIF и не больше POST_IMAGE_MAX_SIDE.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+
+from core import jobs, perf
+from PIL import Image, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import pagecache
+
+# Задача может ждать воркера run_worker, пока очередь не разберётся.
+PENDING_TIMEOUT = 60 * 10
+
+
+class ThumbnailLookup(ThumbnailBackend):
+    """Поиск готовой миниатюры в хранилище sorl без её генерации."""
+
+    def get_cached(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+lookup = ThumbnailLookup()
+
+
+def generate_thumbnails(name):
+    """Готовит все миниатюры картинки."""
+    if not default_storage.exists(name):
+        return
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        get_thumbnail(name, geometry, **options)
+
+
+def _pending_key(name):
+    return f'thumbnails:pending:{name}'
+
+
+@jobs.register('posts.thumbnails', background=True)
+def generate_pending_thumbnails(name):
+    try:
+        generate_thumbnails(name)
+    finally:
+        cache.delete(_pending_key(name))
+
+
+def schedule_thumbnails(name):
+    """Ставит генерацию в очередь, если она ещё не запланирована."""
+    if name and cache.add(_pending_key(name), True, PENDING_TIMEOUT):
+        jobs.enqueue('posts.thumbnails', name=name)
+
+
+def thumbnail_url(image, alias):
+    """URL готовой миниатюры или оригинала, пока миниатюры нет."""
+    if not image:
+        return ''
+    geometry, options = settings.POST_THUMBNAILS[alias]
+    with perf.timer('thumbnails'):
+        thumbnail = lookup.get_cached(image.name, geometry, **options)
+    if thumbnail is not None:
+        return thumbnail.url
+    schedule_thumbnails(image.name)
+    pagecache.skip_current_page()
+    return image.url
+
+
+def _needs_reencoding(image):
+    return (
+        max(image.size) > settings.POST_IMAGE_MAX_SIDE
+        or 'exif' in image.info
+        or bool(image.getexif())
+    )
+
+
+def normalize_image(upload):
+    """Проверяет загруженную картинку и готовит её к сохранению.
+
+    upload.image открыт ImageField без декодирования пикселей, поэтому
+    размеры известны раньше, чем Pillow выделит память под картинку.
+    Возвращает upload или перекодированную копию.
+    """
+    width, height = upload.image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s пикселей.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if not _needs_reencoding(image):
+            upload.seek(0)
+            return upload
+        # Pillow не пишет MPO, а это обычный JPEG с камеры телефона.
+        image_format = 'JPEG' if image.format == 'MPO' else image.format
+        side = settings.POST_IMAGE_MAX_SIDE
+        # JPEG сразу декодируется в уменьшенном масштабе.
+        image.draft('RGB', (side, side))
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((side, side))
+    image.info.pop('exif', None)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        dir=settings.FILE_UPLOAD_TEMP_DIR,
+    )
+    image.save(buffer, format=image_format, quality=85)
+    size = buffer.tell()
+    buffer.seek(0)
+    return UploadedFile(
+        buffer, os.path.basename(upload.name), upload.content_type, size
+    )
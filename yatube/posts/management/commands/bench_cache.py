@@ -0,0 +1,93 @@
+import multiprocessing
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts import cache as feed_cache
+from posts.models import Group, User
+
+
+def _feed_urls(pages):
+    index = reverse('posts:index')
+    urls = [f'{index}?page={page}' for page in range(1, pages + 1)]
+    urls += [
+        reverse('posts:group_list', args=[slug])
+        for slug in Group.objects.values_list('slug', flat=True)[:pages]
+    ]
+    urls += [
+        reverse('posts:profile', args=[username])
+        for username in User.objects.values_list(
+            'username', flat=True
+        ).filter(posts__isnull=False).distinct()[:pages]
+    ]
+    return urls
+
+
+def _worker(urls, requests, seed, reader_id):
+    # После fork соединения с БД у процессов должны быть свои.
+    connections.close_all()
+    feed_cache.stats.clear()
+    client = Client()
+    # Гостю ответил бы кэш целых страниц (posts.pagecache), и до кэша
+    # лент дошёл бы только первый запрос каждого адреса.
+    client.force_login(User.objects.get(pk=reader_id))
+    generator = random.Random(seed)
+    with override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+    ):
+        for _ in range(requests):
+            client.get(generator.choice(urls))
+    return feed_cache.stats['hits'], feed_cache.stats['misses']
+
+
+class Command(BaseCommand):
+    help = (
+        'Доля попаданий в кэш лент при N процессах-воркерах '
+        '(запросы от имени вошедшего пользователя). '
+        'Запускайте с разными CACHE_BACKEND, чтобы сравнить LocMemCache '
+        'с общим кэшем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 2, 4, 8]
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на один воркер.'
+        )
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Сколько страниц каждой ленты участвует в выборке.'
+        )
+
+    def handle(self, *args, **options):
+        urls = _feed_urls(options['pages'])
+        reader_id = User.objects.values_list('pk', flat=True).first()
+        if reader_id is None:
+            raise CommandError('Нет пользователей: запустите seed.')
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'Кэш: {settings.CACHES["default"]["BACKEND"]}, '
+            f'адресов: {len(urls)}'
+        )
+        for workers in options['workers']:
+            cache.clear()
+            with context.Pool(workers) as pool:
+                results = pool.starmap(
+                    _worker,
+                    [(urls, options['requests'], seed, reader_id)
+                     for seed in range(workers)]
+                )
+            hits = sum(hit for hit, _ in results)
+            total = hits + sum(miss for _, miss in results)
+            self.stdout.write(
+                f'воркеров: {workers:>3}  попаданий: {hits}/{total} '
+                f'({hits / max(total, 1):.1%})'
+            )
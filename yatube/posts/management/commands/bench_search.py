@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post, User
+from posts.seeding import FakeData, percentiles
+
+BATCH_SIZE = 5000
+WORDS_PER_POST = 20
+
+
+def _icontains(terms, offset, limit):
+    posts = Post.objects.all()
+    for term in terms:
+        posts = posts.filter(text__icontains=term)
+    return posts.count(), list(posts[offset:offset + limit])
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает движки поиска на синтетических постах. Посты '
+        'создаются во временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument(
+            '--backends', nargs='+',
+            default=['icontains', *sorted(search.ENGINES)],
+            choices=['icontains', *sorted(search.ENGINES)],
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        fake = FakeData(options['seed'])
+        # Половина запросов — частые слова, половина — любые.
+        queries = [
+            fake.random.choices(
+                fake.vocabulary[:500] if i % 2 else fake.vocabulary,
+                k=fake.random.randint(1, 2),
+            )
+            for i in range(options['queries'])
+        ]
+        with transaction.atomic():
+            self.create_posts(options['posts'], fake)
+            for backend in options['backends']:
+                self.bench(backend, queries)
+            transaction.set_rollback(True)
+
+    def create_posts(self, total, fake):
+        author, _ = User.objects.get_or_create(username='bench_search')
+        started = time.perf_counter()
+        for offset in range(0, total, BATCH_SIZE):
+            Post.objects.bulk_create(
+                Post(author=author, text=fake.words(WORDS_PER_POST))
+                for _ in range(min(BATCH_SIZE, total - offset))
+            )
+        self.stdout.write(
+            f'Создано постов: {total} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+
+    def bench(self, backend, queries):
+        if backend == 'icontains':
+            run = _icontains
+        else:
+            engine = search.ENGINES[backend]
+            started = time.perf_counter()
+            engine.rebuild()
+            self.stdout.write(
+                f'{backend}: индекс построен '
+                f'за {time.perf_counter() - started:.1f} с'
+            )
+
+            def run(terms, offset, limit):
+                return engine.count(terms), engine.search(terms, offset, limit)
+
+        timings = []
+        for terms in queries:
+            started = time.perf_counter()
+            run(terms, 0, 10)
+            timings.append((time.perf_counter() - started) * 1000)
+        p50, p95 = percentiles(timings)
+        self.stdout.write(
+            f'{backend:>10}: p50 {p50:.1f} мс, p95 {p95:.1f} мс, '
+            f'запросов {len(timings)}'
+        )
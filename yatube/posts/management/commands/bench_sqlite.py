@@ -0,0 +1,159 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.seeding import percentiles
+
+SCHEMA = '''
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX post_pub_date ON post (pub_date);
+CREATE INDEX post_author_pub_date ON post (author_id, pub_date);
+'''
+# Ровно как в настройках Django по умолчанию: журнал DELETE,
+# synchronous FULL, таймаут sqlite3.connect 5 секунд.
+DEFAULT_PROFILE = {'pragmas': {}, 'timeout': 5, 'persistent': False}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает файл SQLite читателями (страница ленты) и писателями '
+        '(новый пост) в потоках и сравнивает пропускную способность с '
+        'настройками по умолчанию и с профилем SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=8, help='Потоков чтения.'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=2, help='Потоков записи.'
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность прогона каждого профиля.'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=20000,
+            help='Постов в базе перед прогоном.'
+        )
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': DEFAULT_PROFILE,
+            'tuned': {
+                'pragmas': settings.SQLITE_PRAGMAS or {
+                    'journal_mode': 'wal', 'synchronous': 'normal'
+                },
+                'timeout': settings.DATABASES['default'].get(
+                    'OPTIONS', {}
+                ).get('timeout', 20),
+                'persistent': True,
+            },
+        }
+        self.stdout.write(
+            f'{"профиль":<8} {"чтений/с":>9} {"записей/с":>10} '
+            f'{"p95 чт., мс":>12} {"p95 зап., мс":>13} {"locked":>7}'
+        )
+        for name, profile in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.prepare(path, options['rows'])
+                result = self.run(path, profile, options)
+            self.report(name, result, options['seconds'])
+
+    def prepare(self, path, rows):
+        db = sqlite3.connect(path)
+        db.executescript(SCHEMA)
+        now = time.time()
+        db.executemany(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            (
+                (random.randrange(100), 'текст поста ' * 20, now - i)
+                for i in range(rows)
+            ),
+        )
+        db.commit()
+        db.close()
+
+    def connect(self, path, profile):
+        db = sqlite3.connect(
+            path, timeout=profile['timeout'], check_same_thread=False
+        )
+        for pragma, value in profile['pragmas'].items():
+            db.execute(f'PRAGMA {pragma} = {value}')
+        return db
+
+    def run(self, path, profile, options):
+        result = {'read': [], 'write': [], 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+
+        def read(db):
+            db.execute(
+                'SELECT id, author_id, text FROM post WHERE author_id = ? '
+                'ORDER BY pub_date DESC LIMIT 10',
+                [random.randrange(100)],
+            ).fetchall()
+
+        def write(db):
+            db.execute(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                [random.randrange(100), 'новый пост', time.time()],
+            )
+            db.commit()
+
+        def worker(kind, operation):
+            timings, locked = [], 0
+            db = self.connect(path, profile)
+            while time.perf_counter() < deadline:
+                if not profile['persistent']:
+                    # Как CONN_MAX_AGE = 0: соединение на каждый запрос.
+                    db.close()
+                    db = self.connect(path, profile)
+                started = time.perf_counter()
+                try:
+                    operation(db)
+                except sqlite3.OperationalError:
+                    locked += 1
+                    db.rollback()
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+            db.close()
+            with lock:
+                result[kind].extend(timings)
+                result['locked'] += locked
+
+        threads = [
+            threading.Thread(target=worker, args=('read', read))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=('write', write))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    def report(self, name, result, seconds):
+        reads, writes = result['read'], result['write']
+        read_p95 = percentiles(reads)[1] if reads else 0
+        write_p95 = percentiles(writes)[1] if writes else 0
+        self.stdout.write(
+            f'{name:<8} {len(reads) / seconds:>9.0f} '
+            f'{len(writes) / seconds:>10.0f} {read_p95:>12.2f} '
+            f'{write_p95:>13.2f} {result["locked"]:>7}'
+        )
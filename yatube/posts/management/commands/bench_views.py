@@ -0,0 +1,104 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+from posts.seeding import percentiles
+
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет представления posts через тестовый клиент и печатает '
+        'p50/p95 времени ответа и число SQL-запросов. Данные удобно '
+        'подготовить командой seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов к каждому адресу.'
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Отключить кэш, чтобы мерить холодные запросы.'
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запрашивать страницы гостем (кэш готовых страниц).'
+        )
+
+    def sample_urls(self):
+        """Адреса на самых тяжёлых объектах базы."""
+        author = (
+            User.objects.annotate(total=Count('posts'))
+            .order_by('-total').first()
+        )
+        follower = (
+            User.objects.annotate(total=Count('follower'))
+            .order_by('-total').first()
+        )
+        group = (
+            Group.objects.annotate(total=Count('posts'))
+            .order_by('-total').first()
+        )
+        post = Post.objects.order_by('-comments_count').first()
+        if None in (author, group, post) or not Follow.objects.exists():
+            raise CommandError(
+                'Мало данных, сначала выполните python manage.py seed.'
+            )
+        index = reverse('posts:index')
+        pages = Post.objects.count() // settings.POSTS_AMOUNT
+        word = post.text.split()[0]
+        urls = [
+            ('posts:index', []),
+            ('posts:group_list', [group.slug]),
+            ('posts:profile', [author.username]),
+            ('posts:follow_index', []),
+            ('posts:post_detail', [post.pk]),
+        ]
+        urls = [(name, reverse(name, args=args)) for name, args in urls]
+        urls += [
+            ('posts:index ?page=N/2', f'{index}?page={max(pages // 2, 1)}'),
+            ('posts:search', f'{reverse("posts:search")}?q={word}'),
+        ]
+        return follower, urls
+
+    def handle(self, *args, **options):
+        follower, urls = self.sample_urls()
+        client = Client()
+        if options['anonymous']:
+            urls = [url for url in urls if url[0] != 'posts:follow_index']
+        else:
+            client.force_login(follower)
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['no_cache']:
+            overrides['CACHES'] = DUMMY_CACHE
+        self.stdout.write(
+            f'{"адрес":<24} {"p50, мс":>9} {"p95, мс":>9} {"SQL":>5}'
+        )
+        with override_settings(**overrides):
+            for name, url in urls:
+                self.bench(client, name, url, options['requests'])
+
+    def bench(self, client, name, url, requests):
+        timings, queries = [], 0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+        if response.status_code != 200:
+            self.stderr.write(f'{name}: ответ {response.status_code}')
+        p50, p95 = percentiles(timings)
+        self.stdout.write(f'{name:<24} {p50:>9.1f} {p95:>9.1f} {queries:>5}')
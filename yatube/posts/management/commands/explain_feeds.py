@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+
+from posts.routes import QueryCollector, iter_routes, sample_kwargs
+from posts.urls import app_name, urlpatterns
+
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE')
+
+
+def scanned_table(plan_row):
+    """Таблица, которую план SQLite читает целиком, иначе None."""
+    words = str(plan_row[-1]).split()
+    if not words or words[0] != 'SCAN' or 'USING' in words:
+        return None
+    return words[2] if words[1:2] == ['TABLE'] else words[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает планы всех запросов каждого представления posts.views. '
+        'Полные просмотры таблиц помечаются, чтобы регрессии были видны.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Завершиться с ошибкой, если найден полный просмотр.'
+        )
+        parser.add_argument(
+            '--allow-scan', nargs='*', default=['posts_group'],
+            help='Таблицы, которые разрешено читать целиком '
+                 '(список групп в форме поста).'
+        )
+
+    def handle(self, *args, **options):
+        user, kwargs = sample_kwargs()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        client = Client()
+        scans = 0
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            }},
+        ), transaction.atomic():
+            client.force_login(user)
+            for name, url in iter_routes(app_name, urlpatterns, kwargs):
+                scans += self.explain_view(
+                    client, name, url, options['allow_scan']
+                )
+            transaction.set_rollback(True)
+        if scans and options['fail_on_scan']:
+            raise CommandError(f'Полных просмотров таблиц: {scans}')
+
+    def explain_view(self, client, name, url, allowed):
+        if url is None:
+            self.stdout.write(self.style.WARNING(f'{name}: нет данных'))
+            return 0
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            client.get(url)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({url})'))
+        scans = 0
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            for sql, params, many in collector.queries:
+                if many or not sql.lstrip().upper().startswith(EXPLAINED):
+                    continue
+                self.stdout.write(f'  {sql}')
+                cursor.execute(f'{prefix} {sql}', params)
+                for row in cursor.fetchall():
+                    line = f'    {" | ".join(map(str, row))}'
+                    table = scanned_table(row)
+                    if table and table not in allowed:
+                        scans += 1
+                        line = self.style.ERROR(f'{line}  <- полный просмотр')
+                    self.stdout.write(line)
+        return scans
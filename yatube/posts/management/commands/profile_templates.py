@@ -0,0 +1,77 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve
+
+from core import perf
+from posts.models import User
+
+from .bench_views import DUMMY_CACHE
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает страницы тестовым клиентом с PERF_TEMPLATE_PROFILE и '
+        'печатает время каждого шаблона и include на запрос.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='+', help='Адреса страниц, например / или /posts/1/.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Запросов к каждому адресу.'
+        )
+        parser.add_argument(
+            '--user', help='Открывать страницы от имени этого пользователя.'
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Отключить кэш, чтобы страницы рисовались каждый раз.'
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}.')
+            client.force_login(user)
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'PERF_TEMPLATE_PROFILE': True,
+        }
+        if options['no_cache']:
+            overrides['CACHES'] = DUMMY_CACHE
+        with override_settings(**overrides):
+            for url in options['urls']:
+                self.profile(client, url, options['requests'])
+
+    def profile(self, client, url, requests):
+        try:
+            view_name = resolve(urlsplit(url).path).view_name
+        except Resolver404:
+            raise CommandError(f'{url}: нет такого маршрута.')
+        with perf.LOCK:
+            perf.histograms.pop(view_name, None)
+        for _ in range(requests):
+            response = client.get(url)
+        if response.status_code != 200:
+            self.stderr.write(f'{url}: ответ {response.status_code}')
+        stats = perf.histograms[view_name]
+        means = stats.means
+        self.stdout.write(
+            f'{url} ({view_name}): всего {means["total"]:.1f} мс, '
+            f'шаблоны {means.get("templates", 0):.1f} мс, '
+            f'миниатюры {means.get("thumbnails", 0):.1f} мс'
+        )
+        self.stdout.write(
+            f'  {"шаблон":<36} {"раз":>5} {"полное":>8} {"своё":>8}'
+        )
+        for name, calls, total, own in stats.template_profile:
+            self.stdout.write(
+                f'  {name:<36} {calls:>5.1f} {total:>8.2f} {own:>8.2f}'
+            )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Строит поисковый индекс постов заново.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=sorted(search.ENGINES),
+            help='Движок; по умолчанию тот, что выбран SEARCH_BACKEND.'
+        )
+
+    def handle(self, *args, **options):
+        engine = (
+            search.ENGINES[options['backend']] if options['backend']
+            else search.get_engine()
+        )
+        with transaction.atomic():
+            indexed = engine.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов ({engine.name}): {indexed}'
+        ))
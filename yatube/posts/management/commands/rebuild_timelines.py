@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из Follow и Post.'
+
+    def handle(self, *args, **options):
+        built = timelines.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {built}'))
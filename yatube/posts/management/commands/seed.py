@@ -0,0 +1,141 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import cache as feed_cache
+from posts import counters, search, timelines
+from posts.models import Comment, Follow, Group, Post, User
+from posts.seeding import FakeData
+
+PASSWORD = 'seed-password'
+
+
+def _last_pks(model, count):
+    """id только что вставленных строк: bulk_create на SQLite их не
+    возвращает, а новые строки всегда получают самые большие id.
+    """
+    return list(
+        model.objects.order_by('-pk').values_list('pk', flat=True)[:count]
+    )[::-1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками. Популярность авторов и постов '
+        'распределена по Ципфу. Пароль всех пользователей: '
+        f'{PASSWORD}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на одного пользователя.'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.fake = FakeData(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            group_ids = self.create_groups(options['groups'])
+            post_ids = self.create_posts(options['posts'], user_ids, group_ids)
+            self.create_comments(options['comments'], user_ids, post_ids)
+            self.create_follows(options['follows'], user_ids)
+            self.repair()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с'
+        ))
+
+    def bulk_create(self, model, objects, **kwargs):
+        # bulk_create сам делает list(objs), поэтому режем поток заранее,
+        # чтобы в памяти был только один пакет.
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return
+            model.objects.bulk_create(batch, **kwargs)
+
+    def create_users(self, count):
+        start = User.objects.count()
+        password = make_password(PASSWORD)
+        self.bulk_create(User, (
+            User(
+                username=f'user{start + i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            )
+            for i in range(count)
+        ))
+        self.stdout.write(f'Пользователей: {count}')
+        return _last_pks(User, count)
+
+    def create_groups(self, count):
+        start = Group.objects.count()
+        self.bulk_create(Group, (
+            Group(
+                title=self.fake.words(2).capitalize(),
+                slug=f'group-{start + i}',
+                description=self.fake.text(),
+            )
+            for i in range(count)
+        ))
+        self.stdout.write(f'Групп: {count}')
+        return _last_pks(Group, count)
+
+    def create_posts(self, count, user_ids, group_ids):
+        authors = self.fake.popular(user_ids, count)
+        groups = self.fake.popular([None, *group_ids], count)
+        self.bulk_create(Post, (
+            Post(author_id=author, group_id=group, text=self.fake.text())
+            for author, group in zip(authors, groups)
+        ))
+        self.stdout.write(f'Постов: {count}')
+        return _last_pks(Post, count)
+
+    def create_comments(self, count, user_ids, post_ids):
+        posts = self.fake.popular(post_ids[::-1], count)
+        authors = self.fake.random.choices(user_ids, k=count)
+        self.bulk_create(Comment, (
+            Comment(post_id=post, author_id=author, text=self.fake.text(2, 20))
+            for post, author in zip(posts, authors)
+        ))
+        self.stdout.write(f'Комментариев: {count}')
+
+    def create_follows(self, per_user, user_ids):
+        authors = self.fake.popular(user_ids, per_user * len(user_ids))
+        follows = set()
+        for index, author in enumerate(authors):
+            user = user_ids[index // per_user]
+            if user != author:
+                follows.add((user, author))
+        self.bulk_create(
+            Follow,
+            (Follow(user_id=user, author_id=author)
+             for user, author in follows),
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f'Подписок: {len(follows)}')
+
+    def repair(self):
+        """bulk_create обходит сигналы: досчитываем то, что они ведут."""
+        counters.recount_users()
+        counters.recount_posts()
+        indexed = search.get_engine().rebuild()
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
+        if settings.FOLLOW_TIMELINE:
+            timelines.rebuild()
+        feed_cache.bump(feed_cache.INDEX_SCOPE, feed_cache.RELATED_SCOPE)
@@ -0,0 +1,110 @@
+"""Кэш готовых страниц для гостей.
+
+Гостю все страницы ленты показываются одинаково, поэтому ответ целиком
+хранится под ключом из адреса (путь и строка запроса) и версий областей
+страницы. Сигналы Post, Comment, Group и Follow меняют версии ровно тех
+областей, которые задели, и закэшированный ответ перестаёт читаться.
+
+Кэш обходится для вошедших пользователей, а ответы с CSRF-токеном
+(форма комментария и т. п.) или cookie не сохраняются: они годны
+только одному клиенту.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import perf
+
+from . import cache as feed_cache
+
+# Состояние страницы, которую сейчас рисует декорированное представление.
+_current = ContextVar('page_cache', default=None)
+
+
+def skip_current_page():
+    """Запрещает сохранять рисуемую страницу: в ней временные данные,
+    например оригинал картинки вместо ещё не готовой миниатюры.
+    """
+    state = _current.get()
+    if state is not None:
+        state['skip'] = True
+
+
+@contextmanager
+def fragment():
+    """Отслеживает skip_current_page для части страницы.
+
+    Запрет сохранять фрагмент распространяется и на всю страницу.
+    """
+    outer = _current.get()
+    state = {'skip': False}
+    token = _current.set(state)
+    try:
+        yield state
+    finally:
+        _current.reset(token)
+        if state['skip'] and outer is not None:
+            outer['skip'] = True
+
+
+def _cacheable(request, response, state):
+    return (
+        not state['skip']
+        and request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def _store(request, key, state):
+    def callback(response):
+        if _cacheable(request, response, state):
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+    return callback
+
+
+def cache_anonymous_page(get_scopes):
+    """Декоратор представления.
+
+    get_scopes — как у posts.conditional.conditional: области страницы
+    по аргументам представления или None, если объекта нет.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            scopes = feed_cache.request_scopes(
+                request, get_scopes, args, kwargs
+            )
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = feed_cache.response_key(
+                [*scopes, feed_cache.RELATED_SCOPE],
+                request.build_absolute_uri(),
+            )
+            response = cache.get(key)
+            if response is not None:
+                perf.incr('page_cache_hits')
+                return response
+            perf.incr('page_cache_misses')
+            with fragment() as state:
+                response = view(request, *args, **kwargs)
+            # TemplateResponse (about) ещё не отрисован, а CSRF-токен
+            # появляется только при отрисовке.
+            if getattr(response, 'is_rendered', True):
+                _store(request, key, state)(response)
+            else:
+                response.add_post_render_callback(_store(request, key, state))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,75 @@
+"""Обход маршрутов для проверок производительности представлений.
+
+explain_feeds и тест числа запросов открывают каждый маршрут из
+urlpatterns с аргументами, подобранными на самых тяжёлых объектах
+базы: самом плодовитом авторе, самой большой группе и т. д.
+"""
+from django.db.models import Count
+from django.urls import reverse
+
+from .models import Group, Post, User
+
+
+class QueryCollector:
+    """Обёртка connection.execute_wrapper, запоминающая SQL."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params, many))
+        return execute(sql, params, many, context)
+
+    def duplicates(self):
+        """Сколько запросов повторяют уже выполненный SQL-шаблон."""
+        return len(self.queries) - len({sql for sql, _, _ in self.queries})
+
+
+# Аргументы маршрутов, которым не нужны объекты базы.
+STATIC_KWARGS = {
+    'uidb64': 'MQ',
+    'token': 'set-password',
+}
+
+
+def sample_kwargs():
+    """Пользователь для входа и аргументы маршрутов (None — нет данных).
+
+    Пользователь подписан на больше всего авторов, а username — самый
+    плодовитый автор, отличный от него.
+    """
+    user = (
+        User.objects.annotate(total=Count('follower'))
+        .order_by('-total', 'pk').first()
+    )
+    if user is None:
+        return None, {}
+    author = (
+        User.objects.exclude(pk=user.pk)
+        .annotate(total=Count('posts'))
+        .order_by('-total', 'pk').first()
+    ) or user
+    return user, {
+        **STATIC_KWARGS,
+        'slug': (
+            Group.objects.annotate(total=Count('posts'))
+            .order_by('-total', 'pk')
+            .values_list('slug', flat=True).first()
+        ),
+        'username': author.username,
+        'post_id': (
+            Post.objects.order_by('-comments_count', 'pk')
+            .values_list('pk', flat=True).first()
+        ),
+    }
+
+
+def iter_routes(namespace, urlpatterns, sample):
+    """Пары (имя маршрута, адрес) или (имя, None), если нет данных."""
+    for pattern in urlpatterns:
+        name = f'{namespace}:{pattern.name}'
+        kwargs = {key: sample.get(key) for key in pattern.pattern.converters}
+        if None in kwargs.values():
+            yield name, None
+        else:
+            yield name, reverse(name, kwargs=kwargs)
@@ -0,0 +1,246 @@
+"""Полнотекстовый поиск по текстам постов и названиям групп.
+
+На SQLite со сборкой FTS5 индекс — виртуальная таблица posts_search
+(rowid = id поста), ранжирование — bm25. На остальных базах работает
+обратный индекс SearchTerm, который строится на Python. Движок
+выбирается настройкой SEARCH_BACKEND: fts5, python или auto. Индекс
+поддерживают сигналы Post и Group, команда rebuild_search_index
+строит его заново.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+# Вес совпадения в названии группы относительно текста поста.
+GROUP_TITLE_WEIGHT = 0.5
+# Слов запроса больше этого числа не учитываются.
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 2000
+
+_word = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [word[:64] for word in _word.findall(text.lower())]
+
+
+def _group_title(post):
+    return post.group.title if post.group_id else ''
+
+
+def _read_connection():
+    # Поиск только читает: пусть решает роутер (core.replica).
+    return connections[router.db_for_read(Post)]
+
+
+class FTS5Engine:
+    name = 'fts5'
+
+    def _match(self, terms):
+        # Слова состоят только из \w, кавычки внутри невозможны.
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+                'VALUES (%s, %s, %s)',
+                [post.pk, post.text, _group_title(post)]
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def reindex_group(self, group_id, title):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET group_title = %s WHERE rowid IN '
+                '(SELECT id FROM posts_post WHERE group_id = %s)',
+                [title, group_id]
+            )
+
+    def count(self, terms):
+        with _read_connection().cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self._match(terms)]
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, terms, offset, limit):
+        with _read_connection().cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 1.0, {GROUP_TITLE_WEIGHT}), '
+                'rowid DESC LIMIT %s OFFSET %s',
+                [self._match(terms), limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, group_title) '
+                'SELECT posts_post.id, posts_post.text, '
+                "COALESCE(posts_group.title, '') FROM posts_post "
+                'LEFT JOIN posts_group '
+                'ON posts_group.id = posts_post.group_id'
+            )
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+
+class PythonEngine:
+    """Обратный индекс в таблице SearchTerm, ранжирование tf-idf."""
+
+    name = 'python'
+
+    def _terms(self, post_id, text, group_title):
+        weights = Counter(tokenize(text))
+        weights.update(tokenize(group_title))
+        return [
+            SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in weights.items()
+        ]
+
+    def index_post(self, post):
+        SearchTerm.objects.filter(post_id=post.pk).delete()
+        SearchTerm.objects.bulk_create(
+            self._terms(post.pk, post.text, _group_title(post))
+        )
+
+    def remove_post(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def reindex_group(self, group_id, title):
+        posts = Post.objects.filter(group_id=group_id)
+        SearchTerm.objects.filter(post__in=posts).delete()
+        batch = []
+        for pk, text in posts.values_list('pk', 'text').iterator():
+            batch.extend(self._terms(pk, text, title))
+        SearchTerm.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+    def _matches(self, terms):
+        """Посты со всеми словами запроса и их tf-idf, иначе None."""
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=terms)
+            .values_list('term')
+            .annotate(posts=Count('post'))
+        )
+        if len(frequencies) < len(terms):
+            return None
+        total = Post.objects.count()
+        score = Sum(Case(
+            *[
+                When(term=term, then=F('weight') * Value(
+                    math.log(1 + total / posts), output_field=FloatField()
+                ))
+                for term, posts in frequencies.items()
+            ],
+            output_field=FloatField(),
+        ))
+        return (
+            SearchTerm.objects.filter(term__in=terms)
+            .values('post')
+            .annotate(found=Count('term'), score=score)
+            .filter(found=len(terms))
+        )
+
+    def count(self, terms):
+        matches = self._matches(terms)
+        return 0 if matches is None else matches.count()
+
+    def search(self, terms, offset, limit):
+        matches = self._matches(terms)
+        if matches is None:
+            return []
+        rows = matches.order_by('-score', '-post')
+        return [row['post'] for row in rows[offset:offset + limit]]
+
+    def rebuild(self):
+        SearchTerm.objects.all().delete()
+        posts = Post.objects.values_list('pk', 'text', 'group__title')
+        batch = []
+        for pk, text, group_title in posts.iterator():
+            batch.extend(self._terms(pk, text, group_title or ''))
+            if len(batch) >= BATCH_SIZE:
+                SearchTerm.objects.bulk_create(batch)
+                batch = []
+        SearchTerm.objects.bulk_create(batch)
+        return posts.count()
+
+
+ENGINES = {engine.name: engine for engine in (FTS5Engine(), PythonEngine())}
+
+
+def detect_fts_table(sender, connection, **kwargs):
+    """Обработчик connection_created: есть ли в базе таблица FTS5.
+
+    Для SEARCH_BACKEND=auto. Проверка идёт при открытии соединения, а не
+    в запросе к поиску, и PRAGMA берёт схему из памяти без SCAN
+    sqlite_master.
+    """
+    found = False
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA table_info({FTS_TABLE})')
+            found = bool(cursor.fetchall())
+    connection._posts_search_table = found
+
+
+def redetect_fts_table(sender, using, **kwargs):
+    """Обработчик post_migrate: миграция могла создать таблицу FTS5."""
+    detect_fts_table(sender, connections[using])
+
+
+def _has_fts_table():
+    if not hasattr(connection, '_posts_search_table'):
+        detect_fts_table(None, connection)
+    return connection._posts_search_table
+
+
+def get_engine():
+    backend = settings.SEARCH_BACKEND
+    if backend == 'auto':
+        backend = 'fts5' if _has_fts_table() else 'python'
+    return ENGINES[backend]
+
+
+class SearchResults:
+    """Ранжированная выдача, которую режет обычный Paginator.
+
+    Посты каждой страницы читаются одним запросом по id из индекса.
+    """
+
+    def __init__(self, query, engine=None):
+        self.terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        self.engine = engine or get_engine()
+
+    def count(self):
+        if not self.terms:
+            return 0
+        return self.engine.count(self.terms)
+
+    def __getitem__(self, item):
+        if not self.terms:
+            return []
+        ids = self.engine.search(
+            self.terms, item.start or 0, item.stop - (item.start or 0)
+        )
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,59 @@
+"""Синтетические данные для команды seed и бенчмарков."""
+import itertools
+import random
+import statistics
+
+from faker import Faker
+
+VOCABULARY_SIZE = 5000
+
+
+def zipf_weights(size):
+    """Накопленные веса закона Ципфа для random.choices(cum_weights=)."""
+    return list(itertools.accumulate(
+        1 / rank for rank in range(1, size + 1)
+    ))
+
+
+def percentiles(timings):
+    """Пара (p50, p95)."""
+    if len(timings) < 2:
+        return timings[0], timings[0]
+    return statistics.median(timings), statistics.quantiles(timings, n=20)[-1]
+
+
+class FakeData:
+    """Быстрый генератор: словарь и имена берутся у Faker один раз,
+    а тексты собираются из них с частотами по Ципфу, как живой текст.
+    """
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        Faker.seed(seed)
+        fake = Faker('ru_RU')
+        self.vocabulary = list(dict.fromkeys(
+            word.lower() for word in fake.words(VOCABULARY_SIZE * 2)
+        ))[:VOCABULARY_SIZE]
+        self.weights = zipf_weights(len(self.vocabulary))
+        self.first_names = [fake.first_name() for _ in range(200)]
+        self.last_names = [fake.last_name() for _ in range(200)]
+
+    def words(self, count):
+        return ' '.join(self.random.choices(
+            self.vocabulary, cum_weights=self.weights, k=count
+        ))
+
+    def text(self, low=5, high=60):
+        return self.words(self.random.randint(low, high)).capitalize()
+
+    def first_name(self):
+        return self.random.choice(self.first_names)
+
+    def last_name(self):
+        return self.random.choice(self.last_names)
+
+    def popular(self, items, count):
+        """count элементов items, первые выбираются чаще остальных."""
+        return self.random.choices(
+            items, cum_weights=zipf_weights(len(items)), k=count
+        )
@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import cache as feed_cache
+from . import counters, search, timelines
+from .images import schedule_thumbnails
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые видны в карточках постов и лентах.
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk is not None:
+        instance._previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    scopes = {
+        feed_cache.INDEX_SCOPE,
+        feed_cache.author_scope(instance.author_id),
+        feed_cache.post_scope(instance.pk),
+        feed_cache.card_scope(instance.pk),
+    }
+    group_ids = {
+        instance.group_id, getattr(instance, '_previous_group_id', None)
+    }
+    scopes.update(
+        feed_cache.group_scope(group_id)
+        for group_id in group_ids if group_id is not None
+    )
+    feed_cache.bump(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        schedule_thumbnails(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'text', 'group'} & set(update_fields):
+        search.get_engine().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_engine().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_page(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+def reindex_group_posts(sender, instance, created, **kwargs):
+    if not created:
+        search.get_engine().reindex_group(instance.pk, instance.title)
+
+
+@receiver(pre_delete, sender=Group)
+def unindex_group_title(sender, instance, **kwargs):
+    search.get_engine().reindex_group(instance.pk, '')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, created=False, **kwargs):
+    # Новую группу ещё не показывает ни одна страница.
+    if created:
+        return
+    feed_cache.bump(
+        feed_cache.RELATED_SCOPE, feed_cache.group_scope(instance.pk)
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_name(sender, instance, update_fields, **kwargs):
+    instance._previous_name = None
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(AUTHOR_NAME_FIELDS) & set(update_fields)
+    ):
+        return
+    instance._previous_name = (
+        User.objects.filter(pk=instance.pk)
+        .values_list(*AUTHOR_NAME_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, **kwargs):
+    # Пароль, почта, флаги и last_login на страницах не видны.
+    previous = getattr(instance, '_previous_name', None)
+    current = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if created or previous is None or previous == current:
+        return
+    feed_cache.bump(
+        feed_cache.RELATED_SCOPE, feed_cache.author_scope(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_set(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.follows_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created and settings.FOLLOW_TIMELINE:
+        timelines.schedule_fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created and settings.FOLLOW_TIMELINE:
+        timelines.backfill(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    if settings.FOLLOW_TIMELINE:
+        timelines.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+def _count_post(post, delta):
+    counters.schedule(users=[(post.author_id, 'posts_count', delta)])
+
+
+def _count_comment(comment, delta):
+    counters.schedule(
+        users=[(comment.author_id, 'comments_count', delta)],
+        posts=[(comment.post_id, delta)],
+    )
+
+
+def _count_follow(follow, delta):
+    counters.schedule(users=[
+        (follow.author_id, 'followers_count', delta),
+        (follow.user_id, 'following_count', delta),
+    ])
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created:
+        _count_post(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    _count_post(instance, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        _count_comment(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    _count_comment(instance, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        _count_follow(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    _count_follow(instance, -1)
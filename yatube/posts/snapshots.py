@@ -0,0 +1,169 @@
+"""Снимки постов для кэша лент.
+
+В кэше страниц лент лежит не Post со связанными User и Group, а
+PostSnapshot: только то, что рисует includes/post.html. Снимки
+неизменяемы, а страница из десяти постов сериализуется dumps в
+несколько килобайт и читается loads без ORM.
+
+Формат записи: id и pub_date (микросекунды от эпохи) — int64, длины
+шести строк UTF-8 — uint32, затем сами строки: текст, username и полное
+имя автора, slug и название группы, имя файла картинки. Пустой slug —
+пост без группы, пустое имя файла — без картинки. Записи страницы идут
+подряд. При смене формата увеличьте posts.cache.SCHEMA.
+"""
+import struct
+from datetime import datetime, timedelta, timezone
+
+from django.core.files.storage import default_storage
+
+from .models import Post
+
+_HEADER = struct.Struct('<qq6I')
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} нельзя изменить')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} нельзя изменить')
+
+
+class AuthorSnapshot(_Frozen):
+    __slots__ = ('username', 'full_name')
+
+    def __init__(self, username, full_name):
+        super().__init__(username=username, full_name=full_name)
+
+    def get_full_name(self):
+        return self.full_name
+
+    def __str__(self):
+        return self.username
+
+
+class GroupSnapshot(_Frozen):
+    __slots__ = ('slug', 'title')
+
+    def __init__(self, slug, title):
+        super().__init__(slug=slug, title=title)
+
+    def __str__(self):
+        return self.title
+
+
+class ImageSnapshot(_Frozen):
+    """Имя файла картинки; в шаблонах ведёт себя как FieldFile."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        super().__init__(name=name)
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+    def __bool__(self):
+        return bool(self.name)
+
+    def __eq__(self, other):
+        return self.name == getattr(other, 'name', other)
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __str__(self):
+        return self.name
+
+
+class PostSnapshot(_Frozen):
+    __slots__ = ('id', 'text', 'pub_date', 'author', 'group', 'image')
+
+    def __init__(self, id, text, pub_date, author, group, image):
+        super().__init__(
+            id=id, text=text, pub_date=pub_date,
+            author=author, group=group, image=image,
+        )
+
+    @classmethod
+    def from_post(cls, post):
+        """Снимок поста из Post.objects.for_feed()."""
+        author, group = post.author, post.group
+        return cls(
+            post.pk,
+            post.text,
+            post.pub_date,
+            AuthorSnapshot(author.username, author.get_full_name()),
+            group and GroupSnapshot(group.slug, group.title),
+            ImageSnapshot(post.image.name or ''),
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        # Как у моделей: снимок равен своему посту.
+        if isinstance(other, (PostSnapshot, Post)):
+            return self.id == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<PostSnapshot: {self.id}>'
+
+
+def _encode(snapshot):
+    group = snapshot.group
+    strings = [
+        value.encode() for value in (
+            snapshot.text,
+            snapshot.author.username,
+            snapshot.author.full_name,
+            group.slug if group else '',
+            group.title if group else '',
+            snapshot.image.name,
+        )
+    ]
+    micros = (snapshot.pub_date - _EPOCH) // _MICROSECOND
+    return (
+        _HEADER.pack(snapshot.id, micros, *map(len, strings))
+        + b''.join(strings)
+    )
+
+
+def dumps(snapshots):
+    return b''.join(map(_encode, snapshots))
+
+
+def loads(data):
+    view = memoryview(data)
+    offset, snapshots = 0, []
+    while offset < len(view):
+        pk, micros, *lengths = _HEADER.unpack_from(view, offset)
+        offset += _HEADER.size
+        strings = []
+        for length in lengths:
+            strings.append(str(view[offset:offset + length], 'utf-8'))
+            offset += length
+        text, username, full_name, slug, title, image = strings
+        snapshots.append(PostSnapshot(
+            pk,
+            text,
+            _EPOCH + micros * _MICROSECOND,
+            AuthorSnapshot(username, full_name),
+            GroupSnapshot(slug, title) if slug else None,
+            ImageSnapshot(image),
+        ))
+    return snapshots
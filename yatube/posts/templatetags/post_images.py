@@ -0,0 +1,11 @@
+from django import template
+
+from posts.images import thumbnail_url as get_thumbnail_url
+
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_url(image, alias):
+    return get_thumbnail_url(image, alias)
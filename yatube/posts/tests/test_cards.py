@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.cards import render_cards
+from posts.models import Group, Post, User
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(10)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def posts(self):
+        return list(Post.objects.for_feed())
+
+    def test_cards_are_cached(self):
+        """Повторная отрисовка берёт все карточки одним get_many."""
+        first = render_cards(self.posts())
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many:
+            with self.assertTemplateNotUsed('includes/post.html'):
+                second = render_cards(self.posts())
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(second, first)
+
+    def test_hidden_group_is_separate_card(self):
+        """Карточка без группы хранится отдельно."""
+        render_cards(self.posts())
+        cards = render_cards(self.posts(), hidden_group=True)
+        self.assertNotIn('Тестовая группа', cards[0])
+
+    def test_changes_redraw_cards(self):
+        """Правка поста, группы и автора перерисовывает карточку."""
+        changes = [
+            ('Новый текст', self.edit_post),
+            ('Новое название', self.rename_group),
+            ('Софья', self.rename_author),
+        ]
+        for text, change in changes:
+            with self.subTest(text=text):
+                self.assertNotIn(text, render_cards(self.posts())[0])
+                change(text)
+                self.assertIn(text, render_cards(self.posts())[0])
+
+    def test_unrelated_changes_keep_cards(self):
+        """Пароль, почта и новая группа не сбрасывают карточки."""
+        render_cards(self.posts())
+        author = User.objects.get(pk=self.author.pk)
+        author.set_password('Pa55word!')
+        author.email = 'author@example.com'
+        author.save()
+        Group.objects.create(title='Другая группа', slug='other')
+        with self.assertTemplateNotUsed('includes/post.html'):
+            render_cards(self.posts())
+
+    def edit_post(self, text):
+        post = Post.objects.for_feed().first()
+        post.text = text
+        post.save(update_fields=['text'])
+
+    def rename_group(self, title):
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = title
+        group.save()
+
+    def rename_author(self, first_name):
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = first_name
+        author.save()
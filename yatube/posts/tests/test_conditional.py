@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=[cls.group.slug]),
+            'profile': reverse('posts:profile', args=[cls.author.username]),
+            'post': reverse('posts:post_detail', args=[cls.post.pk]),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTests.reader)
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отдаётся 304 без шаблонов."""
+        for name, url in ConditionalGetTests.urls.items():
+            with self.subTest(page=name):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_etag_varies_on_user(self):
+        """У гостя и пользователя разные ETag одной страницы."""
+        url = ConditionalGetTests.urls['index']
+        etag = self.guest_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def rename_author(self):
+        author = User.objects.get(pk=ConditionalGetTests.author.pk)
+        author.first_name = 'Софья'
+        author.save()
+
+    def test_changes_invalidate_etag(self):
+        """Правки данных страницы меняют её ETag."""
+        urls = ConditionalGetTests.urls
+        changes = [
+            (urls['post'], lambda: Comment.objects.create(
+                post=ConditionalGetTests.post,
+                author=ConditionalGetTests.reader,
+                text='Комментарий',
+            )),
+            (urls['profile'], lambda: Follow.objects.create(
+                user=ConditionalGetTests.reader,
+                author=ConditionalGetTests.author,
+            )),
+            (urls['group'], lambda: Post.objects.create(
+                author=ConditionalGetTests.reader,
+                text='Ещё пост',
+                group=ConditionalGetTests.group,
+            )),
+            (urls['index'], self.rename_author),
+        ]
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                change()
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
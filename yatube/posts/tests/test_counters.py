@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+USER_USERNAME = 'TestUser'
+AUTHOR_USERNAME = 'Author'
+URL_POST_CREATE_PAGE = reverse('posts:post_create')
+URL_PROFILE_FOLLOW_PAGE = reverse(
+    'posts:profile_follow', kwargs={'username': AUTHOR_USERNAME}
+)
+URL_PROFILE_UNFOLLOW_PAGE = reverse(
+    'posts:profile_unfollow', kwargs={'username': AUTHOR_USERNAME}
+)
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user_client = Client()
+        cls.user_client.force_login(cls.user)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        self.author_client.post(URL_POST_CREATE_PAGE, {'text': 'Пост'})
+        post = Post.objects.get()
+        self.user_client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'}
+        )
+        self.user_client.get(URL_PROFILE_FOLLOW_PAGE)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(CountersTests.author).posts_count, 1)
+        self.assertEqual(self.stats(CountersTests.author).followers_count, 1)
+        self.assertEqual(self.stats(CountersTests.user).comments_count, 1)
+        self.assertEqual(self.stats(CountersTests.user).following_count, 1)
+
+        self.user_client.get(URL_PROFILE_UNFOLLOW_PAGE)
+        post.delete()
+        author_stats = self.stats(CountersTests.author)
+        user_stats = self.stats(CountersTests.user)
+        self.assertEqual(author_stats.posts_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(user_stats.comments_count, 0)
+        self.assertEqual(user_stats.following_count, 0)
+
+    def test_recount_counters_repairs_drift(self):
+        post = Post.objects.create(author=CountersTests.author, text='Пост')
+        Comment.objects.create(
+            post=post, author=CountersTests.user, text='Комментарий'
+        )
+        Follow.objects.create(
+            user=CountersTests.user, author=CountersTests.author
+        )
+        UserStats.objects.update(
+            posts_count=7, comments_count=7,
+            followers_count=7, following_count=7
+        )
+        UserStats.objects.filter(user=CountersTests.user).delete()
+        Post.objects.update(comments_count=7)
+        call_command('recount_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        author_stats = self.stats(CountersTests.author)
+        user_stats = self.stats(CountersTests.user)
+        self.assertEqual(
+            (author_stats.posts_count, author_stats.followers_count), (1, 1)
+        )
+        self.assertEqual(
+            (user_stats.comments_count, user_stats.following_count), (1, 1)
+        )
+
+    def test_delete_user_with_posts_and_follows(self):
+        """Удаление пользователя с постами, комментариями и подписками
+        не воссоздаёт его UserStats и не нарушает внешних ключей.
+        """
+        doomed = User.objects.create_user(username='Doomed')
+        post = Post.objects.create(author=doomed, text='Пост')
+        Comment.objects.create(post=post, author=doomed, text='Комментарий')
+        Follow.objects.create(user=doomed, author=CountersTests.author)
+        Follow.objects.create(user=CountersTests.user, author=doomed)
+        doomed_id = doomed.pk
+        doomed.delete()
+        connection.check_constraints()
+        self.assertFalse(UserStats.objects.filter(user_id=doomed_id).exists())
+        self.assertEqual(self.stats(CountersTests.author).followers_count, 0)
+        self.assertEqual(self.stats(CountersTests.user).following_count, 0)
@@ -0,0 +1,55 @@
+import threading
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def create_sample_data():
+    author = User.objects.create_user(username='Author')
+    reader = User.objects.create_user(username='Reader')
+    group = Group.objects.create(
+        title='Тестовая группа',
+        slug='test-slug',
+        description='Тестовое описание',
+    )
+    post = Post.objects.create(author=author, text='Пост', group=group)
+    Comment.objects.create(post=post, author=reader, text='Комментарий')
+    Follow.objects.create(user=reader, author=author)
+
+
+class ExplainFeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        create_sample_data()
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы представлений posts не читают таблицы целиком."""
+        out = StringIO()
+        call_command('explain_feeds', '--fail-on-scan', stdout=out)
+        self.assertIn('posts:index', out.getvalue())
+
+
+class FreshConnectionExplainTests(TransactionTestCase):
+    def test_fresh_connection_has_no_scans(self):
+        """Новое соединение не читает схему в запросах представлений."""
+        create_sample_data()
+        out, errors = StringIO(), []
+
+        def explain():
+            try:
+                call_command('explain_feeds', '--fail-on-scan', stdout=out)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        # У потока своё, ещё не открытое соединение.
+        thread = threading.Thread(target=explain)
+        thread.start()
+        thread.join()
+        self.assertEqual(errors, [], out.getvalue())
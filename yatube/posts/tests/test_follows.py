@@ -0,0 +1,113 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters
+from posts.follows import FollowSet, follow, follow_many, unfollow
+from posts.models import Follow, User, UserStats
+
+
+class FollowSetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(5)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author)
+            for author in cls.authors[:3]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_membership_loads_once(self):
+        """Все проверки запроса стоят один SQL, повторный запрос — ни
+        одного.
+        """
+        follows = FollowSet(self.reader)
+        with self.assertNumQueries(1):
+            checks = [author in follows for author in self.authors]
+            self.assertIn(self.authors[0].pk, follows)
+        self.assertEqual(checks, [True, True, True, False, False])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(FollowSet(self.reader)), 3)
+
+    def test_anonymous_follows_nobody(self):
+        """Гость ни на кого не подписан, база не нужна."""
+        with self.assertNumQueries(0):
+            self.assertNotIn(self.authors[0], FollowSet(AnonymousUser()))
+
+    def test_follow_and_unfollow_invalidate(self):
+        """Подписка и отписка сразу видны на странице автора."""
+        author = self.authors[4]
+        url = reverse('posts:profile', args=[author.username])
+        self.assertFalse(self.reader_client.get(url).context['following'])
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        self.assertTrue(self.reader_client.get(url).context['following'])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[author.username])
+        )
+        self.assertFalse(self.reader_client.get(url).context['following'])
+
+
+class FollowWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(4)
+        ]
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_follow_is_idempotent(self):
+        """Повторные подписка и отписка не ошибаются и не сбивают
+        счётчики.
+        """
+        author = self.authors[0]
+        self.assertTrue(follow(self.reader, author))
+        self.assertFalse(follow(self.reader, author))
+        self.assertEqual(self.stats(author).followers_count, 1)
+        self.assertTrue(unfollow(self.reader, author))
+        self.assertFalse(unfollow(self.reader, author))
+        self.assertEqual(self.stats(author).followers_count, 0)
+        self.assertFalse(follow(self.reader, self.reader))
+        self.assertEqual(counters.recount_users(), 0)
+
+    def test_write_is_single_statement(self):
+        """Подписка — одна вставка, отписка — одно удаление."""
+        author = self.authors[0]
+        for action, verb in ((follow, 'INSERT'), (unfollow, 'DELETE')):
+            with self.subTest(verb=verb):
+                with CaptureQueriesContext(connection) as captured:
+                    action(self.reader, author)
+                follows = [
+                    query['sql'] for query in captured
+                    if '"posts_follow"' in query['sql']
+                ]
+                self.assertEqual(len(follows), 1)
+                self.assertTrue(follows[0].startswith(verb))
+
+    def test_follow_many(self):
+        """Пачка подписок с уже существующими и лишними id."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        created = follow_many(
+            self.reader, [*self.authors, self.reader.pk, 10 ** 6]
+        )
+        self.assertEqual(created, 3)
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 4
+        )
+        self.assertEqual(self.stats(self.reader).following_count, 4)
+        self.assertEqual(counters.recount_users(), 0)
+        self.assertEqual(len(FollowSet(self.reader)), 4)
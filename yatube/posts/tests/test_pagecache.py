@@ -0,0 +1,109 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.pagecache import cache_anonymous_page
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=[self.group.slug]),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+            'post': reverse('posts:post_detail', args=[self.post.pk]),
+            'author': reverse('about:author'),
+            'tech': reverse('about:tech'),
+        }
+
+    def test_guest_pages_are_cached(self):
+        """Повторный гостевой запрос отдаётся без шаблонов."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                first = self.guest_client.get(url)
+                second = self.guest_client.get(url)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.templates, [])
+                self.assertEqual(second.content, first.content)
+
+    def test_index_hit_without_queries(self):
+        """Закэшированная главная не обращается к базе."""
+        self.guest_client.get(self.urls['index'])
+        with self.assertNumQueries(0):
+            self.guest_client.get(self.urls['index'])
+
+    def test_query_string_is_part_of_key(self):
+        """Разные страницы пагинации хранятся отдельно."""
+        url = self.urls['index']
+        self.guest_client.get(url)
+        response = self.guest_client.get(f'{url}?page=2')
+        self.assertNotEqual(response.templates, [])
+
+    def test_authenticated_bypass(self):
+        """Вошедшему пользователю страница всегда рисуется заново."""
+        url = self.urls['post']
+        self.guest_client.get(url)
+        self.reader_client.get(url)
+        response = self.reader_client.get(url)
+        self.assertNotEqual(response.templates, [])
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_csrf_pages_are_not_stored(self):
+        """Ответ с CSRF-токеном не сохраняется."""
+        @cache_anonymous_page(lambda: ['test'])
+        def view(request):
+            return HttpResponse(get_token(request))
+
+        request = RequestFactory().get('/form/')
+        request.user = AnonymousUser()
+        first = view(request).content
+        request = RequestFactory().get('/form/')
+        request.user = AnonymousUser()
+        self.assertNotEqual(view(request).content, first)
+
+    def rename_group(self):
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+
+    def test_changes_purge_pages(self):
+        """Сигналы сбрасывают ровно затронутые страницы."""
+        changes = [
+            ('post', 'Новый комментарий', lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Новый комментарий'
+            )),
+            ('profile', 'подписчиков: 1', lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )),
+            ('group', 'Новое название', self.rename_group),
+            ('index', 'Свежий пост', lambda: Post.objects.create(
+                author=self.reader, text='Свежий пост'
+            )),
+        ]
+        for name, text, change in changes:
+            with self.subTest(page=name):
+                url = self.urls[name]
+                self.assertNotContains(self.guest_client.get(url), text)
+                change()
+                self.assertContains(self.guest_client.get(url), text)
@@ -0,0 +1,82 @@
+"""Число SQL-запросов каждого маршрута posts и users.
+
+Маршруты открываются на данных команды seed, результат сверяется с
+query_counts.json. Рост числа запросов или повторов одного SQL-шаблона
+(признак N+1) роняет тест. После намеренного изменения обновите файл:
+    UPDATE_QUERY_BASELINE=1 python manage.py test posts.tests.test_query_counts
+"""
+import json
+import os
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+
+from posts import urls as posts_urls
+from posts.routes import QueryCollector, iter_routes, sample_kwargs
+from users import urls as users_urls
+
+BASELINE = Path(__file__).with_name('query_counts.json')
+URLCONFS = (posts_urls, users_urls)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+})
+class QueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed', '--users', '30', '--groups', '3', '--posts', '150',
+            '--comments', '300', '--follows', '5', stdout=StringIO(),
+        )
+
+    def measure(self, user, url):
+        client = Client()
+        client.force_login(user)
+        collector = QueryCollector()
+        # Маршруты вроде profile_follow меняют данные: откатываем их.
+        with transaction.atomic():
+            with connection.execute_wrapper(collector):
+                client.get(url)
+            transaction.set_rollback(True)
+        return {
+            'queries': len(collector.queries),
+            'duplicates': collector.duplicates(),
+        }
+
+    def collect(self):
+        user, sample = sample_kwargs()
+        counts = {}
+        for urlconf in URLCONFS:
+            for name, url in iter_routes(
+                urlconf.app_name, urlconf.urlpatterns, sample
+            ):
+                self.assertIsNotNone(url, f'{name}: нет данных')
+                counts[name] = self.measure(user, url)
+        return counts
+
+    def test_routes_match_baseline(self):
+        """Маршруты не делают больше запросов, чем записано в базовой
+        линии.
+        """
+        counts = self.collect()
+        if os.getenv('UPDATE_QUERY_BASELINE'):
+            BASELINE.write_text(
+                json.dumps(counts, indent=2, sort_keys=True) + '\n'
+            )
+            self.skipTest(f'Базовая линия записана в {BASELINE}')
+        baseline = json.loads(BASELINE.read_text())
+        for name, actual in counts.items():
+            with self.subTest(route=name):
+                self.assertIn(
+                    name, baseline,
+                    'Новый маршрут: обновите базовую линию.'
+                )
+                for key, value in actual.items():
+                    self.assertLessEqual(
+                        value, baseline[name][key],
+                        f'{name}: {key} {value}, было {baseline[name][key]}'
+                    )
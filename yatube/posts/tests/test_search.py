@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, SearchTerm, User
+from posts.search import SearchResults, get_engine
+
+URL_SEARCH = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    backend = 'fts5'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.settings_override = override_settings(SEARCH_BACKEND=cls.backend)
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котиков'
+        )
+        cls.often = Post.objects.create(
+            author=cls.user, text='Ёжик и ёжик, снова ёжик в тумане'
+        )
+        cls.once = Post.objects.create(
+            author=cls.user, text='Туманный ёжик', group=cls.group
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про белку')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def found(self, query):
+        return list(SearchResults(query)[0:10])
+
+    def test_ranked_results(self):
+        """Пост с большим числом совпадений выше в выдаче."""
+        self.assertEqual(
+            self.found('ЁЖИК'), [self.often, self.once]
+        )
+        self.assertEqual(self.found('ёжик белку'), [])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_group_title_is_indexed(self):
+        """Название группы ищется и переиндексируется при изменении."""
+        self.assertEqual(self.found('котики'), [self.once])
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Собачки'
+        group.save()
+        self.assertEqual(self.found('котики'), [])
+        self.assertEqual(self.found('собачки'), [self.once])
+
+    def test_index_follows_post_changes(self):
+        """Сигналы Post обновляют индекс."""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'Про ёжика'
+        other.save()
+        self.assertEqual(self.found('белку'), [])
+        self.assertEqual(self.found('ёжика'), [other])
+        Post.objects.get(pk=self.once.pk).delete()
+        self.assertEqual(self.found('туманный'), [])
+
+    def test_rebuild(self):
+        """Команда перестраивает индекс после массовых изменений."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Массовая загрузка')
+        ])
+        self.assertEqual(self.found('массовая'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.found('массовая')), 1)
+
+    @override_settings(SEARCH_BACKEND='auto')
+    def test_auto_backend(self):
+        """auto выбирает FTS5, созданную миграцией после открытия
+        соединения.
+        """
+        self.assertEqual(get_engine().name, 'fts5')
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты и сохраняет запрос
+        в ссылках пагинации.
+        """
+        response = self.guest_client.get(URL_SEARCH, {'q': 'ёжик'})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.often, self.once]
+        )
+        self.assertEqual(
+            response.context['page_query'], 'q=%D1%91%D0%B6%D0%B8%D0%BA&'
+        )
+
+
+class PythonSearchTests(SearchTests):
+    backend = 'python'
+
+    def test_terms_are_weighted(self):
+        """Обратный индекс хранит число вхождений слова."""
+        term = SearchTerm.objects.get(post=self.often, term='ёжик')
+        self.assertEqual(term.weight, 3)
@@ -0,0 +1,32 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, User
+from posts.search import SearchResults
+
+
+class SeedTests(TestCase):
+    def test_seed_and_bench(self):
+        """seed создаёт связные данные, bench_views проходит по ним."""
+        call_command(
+            'seed', '--users', '20', '--groups', '3', '--posts', '60',
+            '--comments', '80', '--follows', '4', '--batch-size', '25',
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(counters.recount_users(), 0)
+        self.assertEqual(counters.recount_posts(), 0)
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(SearchResults(word).count())
+        out = StringIO()
+        call_command('bench_views', '--requests', '2', stdout=out)
+        for name in ('posts:index', 'posts:follow_index', 'posts:search'):
+            with self.subTest(name=name):
+                self.assertIn(name, out.getvalue())
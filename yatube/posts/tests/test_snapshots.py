@@ -0,0 +1,89 @@
+import pickle
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import snapshots
+from posts.models import Group, Post, User
+from posts.snapshots import PostSnapshot
+
+
+class PostSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост ' * 50,
+            image='posts/small.gif',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост без группы {i}')
+            for i in range(9)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def posts(self):
+        return list(Post.objects.for_feed().order_by('-pk'))
+
+    def test_round_trip(self):
+        """loads возвращает те же поля без запросов к базе."""
+        posts = self.posts()
+        data = snapshots.dumps(map(PostSnapshot.from_post, posts))
+        with self.assertNumQueries(0):
+            loaded = snapshots.loads(data)
+        self.assertEqual(loaded, posts)
+        for snapshot, post in zip(loaded, posts):
+            with self.subTest(post=post.pk):
+                self.assertEqual(snapshot.text, post.text)
+                self.assertEqual(snapshot.pub_date, post.pub_date)
+                self.assertEqual(
+                    snapshot.author.get_full_name(),
+                    post.author.get_full_name()
+                )
+                self.assertEqual(snapshot.image, post.image)
+                self.assertEqual(
+                    bool(snapshot.group), post.group_id is not None
+                )
+        self.assertEqual(loaded[-1].group.title, self.group.title)
+
+    def test_compact_and_immutable(self):
+        """Снимки меньше pickle моделей и не меняются."""
+        posts = self.posts()
+        data = snapshots.dumps(map(PostSnapshot.from_post, posts))
+        self.assertLess(len(data), len(pickle.dumps(posts)) / 2)
+        snapshot = snapshots.loads(data)[0]
+        with self.assertRaises(AttributeError):
+            snapshot.text = 'Другой текст'
+        with self.assertRaises(AttributeError):
+            snapshot.extra = True
+
+    def test_card_matches_model(self):
+        """Карточка снимка совпадает с карточкой поста."""
+        post = self.posts()[-1]
+        self.assertHTMLEqual(
+            render_to_string(
+                'includes/post.html', {'post': PostSnapshot.from_post(post)}
+            ),
+            render_to_string('includes/post.html', {'post': post}),
+        )
+
+    def test_cached_feed_page_holds_snapshots(self):
+        """Закэшированная страница ленты — снимки, а не модели."""
+        client = Client()
+        client.force_login(self.author)
+        client.get(reverse('posts:index'))
+        response = client.get(reverse('posts:index'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        self.assertIsInstance(page[0], PostSnapshot)
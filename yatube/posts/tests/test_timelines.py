@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timelines import CURSOR_FIELDS, follow_feed
+from posts.utils import CursorPaginator, encode_cursor
+
+FOLLOWER_USERNAME = 'Follower'
+AUTHOR_USERNAME = 'Author'
+URL_FOLLOW_INDEX_PAGE = reverse('posts:follow_index')
+URL_PROFILE_FOLLOW_PAGE = reverse(
+    'posts:profile_follow', kwargs={'username': AUTHOR_USERNAME}
+)
+URL_PROFILE_UNFOLLOW_PAGE = reverse(
+    'posts:profile_unfollow', kwargs={'username': AUTHOR_USERNAME}
+)
+URL_POST_CREATE_PAGE = reverse('posts:post_create')
+
+
+@override_settings(FOLLOW_TIMELINE=True, FOLLOW_TIMELINE_SIZE=3)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username=FOLLOWER_USERNAME)
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+
+    def feed(self):
+        response = self.follower_client.get(URL_FOLLOW_INDEX_PAGE)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        for i in range(5):
+            Post.objects.create(author=TimelineTests.author, text=f'Пост {i}')
+        self.follower_client.get(URL_PROFILE_FOLLOW_PAGE)
+        self.assertEqual(self.feed(), ['Пост 4', 'Пост 3', 'Пост 2'])
+        self.follower_client.get(URL_PROFILE_UNFOLLOW_PAGE)
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(
+            user=TimelineTests.follower, author=TimelineTests.author
+        )
+        self.author_client.post(URL_POST_CREATE_PAGE, {'text': 'Новый пост'})
+        self.assertEqual(self.feed(), ['Новый пост'])
+
+    def test_rebuild_timelines(self):
+        Follow.objects.create(
+            user=TimelineTests.follower, author=TimelineTests.author
+        )
+        Post.objects.create(author=TimelineTests.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), ['Пост'])
+
+    def test_page_is_read_from_timeline_index(self):
+        """Страница ленты читается из индекса (user, -pub_date, -post)
+        без отдельной сортировки.
+        """
+        Follow.objects.create(
+            user=TimelineTests.follower, author=TimelineTests.author
+        )
+        post = Post.objects.create(author=TimelineTests.author, text='Пост')
+        paginator = CursorPaginator(
+            follow_feed(TimelineTests.follower), 10, **CURSOR_FIELDS
+        )
+        after = encode_cursor(post.pub_date, post.pk + 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(list(paginator.get_page(after=after)), [post])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {queries[-1]["sql"]}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('timeline_user_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
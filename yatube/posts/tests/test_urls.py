@@ -132,7 +132,7 @@ class PostsURLTests(TestCase):
             [
                 self.author,
                 URL_PROFILE_UNFOLLOW_PAGE,
-                HTTPStatus.NOT_FOUND
+                HTTPStatus.FOUND
             ]
         ]
         for client, url, status in cases:
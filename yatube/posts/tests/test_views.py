@@ -1,13 +1,22 @@
 import shutil
 import tempfile
+from datetime import datetime, timedelta, timezone
+from itertools import product
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
+from .. import follows
+from ..cache import INDEX_SCOPE, follows_scope, get_versions
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import encode_cursor
+from .utils import QueryBudgetMixin
 
 
 GROUP_SLUG = 'test-slug'
@@ -87,10 +96,20 @@ class PostsPagesTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     def asserts(self, post):
-        self.assertEqual(post.author, PostsPagesTests.post.author)
+        # В лентах посты — снимки PostSnapshot: сверяем поля, а не модели.
+        expected = PostsPagesTests.post
+        self.assertEqual(post.author.username, expected.author.username)
+        self.assertEqual(
+            post.author.get_full_name(), expected.author.get_full_name()
+        )
         self.assertEqual(post.text, PostsPagesTests.post.text)
-        self.assertEqual(post.group, PostsPagesTests.post.group)
+        self.assertEqual(post.group.slug, expected.group.slug)
+        self.assertEqual(post.group.title, expected.group.title)
+        self.assertEqual(post.pub_date, expected.pub_date)
         self.assertEqual(post.id, PostsPagesTests.post.pk)
         self.assertEqual(post.image, PostsPagesTests.post.image)
 
@@ -170,17 +189,107 @@ class PostsPagesTests(TestCase):
                     len(response.context['page_obj']), posts_on_page
                 )
 
+    def test_cursor_pagination(self):
+        """Курсорная пагинация листает ленты без пропусков и повторов."""
+        Post.objects.all().delete()
+        Post.objects.bulk_create(
+            Post(author=PostsPagesTests.user, text=f'Пост {i}')
+            for i in range(settings.POSTS_AMOUNT + 1)
+        )
+        for url in [URL_INDEX_PAGE, URL_PROFILE_PAGE]:
+            with self.subTest(url=url):
+                first_page = self.guest_client.get(url).context['page_obj']
+                self.assertEqual(len(first_page), settings.POSTS_AMOUNT)
+                self.assertFalse(first_page.has_previous())
+                after = first_page.paginator.next_cursor
+                second_page = self.guest_client.get(
+                    url, {'after': after}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), 1)
+                self.assertFalse(second_page.has_next())
+                self.assertNotIn(second_page[0], list(first_page))
+                before = second_page.paginator.previous_cursor
+                back_page = self.guest_client.get(
+                    url, {'before': before}
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_broken_cursor_shows_first_page(self):
+        """Курсор с ключом вне диапазона или датой без зоны не роняет
+        ленту, а открывает первую страницу.
+        """
+        now = PostsPagesTests.post.pub_date
+        cursors = [
+            'не-курсор',
+            encode_cursor(now, 2 ** 63),
+            encode_cursor(now, -1),
+            encode_cursor(now.replace(tzinfo=None), 1),
+            encode_cursor(
+                datetime(1, 1, 1, tzinfo=timezone(timedelta(hours=1))), 5
+            ),
+            encode_cursor(
+                datetime(9999, 12, 31, 23, 59,
+                         tzinfo=timezone(timedelta(hours=-5))), 5
+            ),
+        ]
+        for cursor, param in product(cursors, ['after', 'before']):
+            with self.subTest(cursor=cursor, param=param):
+                response = self.guest_client.get(
+                    URL_INDEX_PAGE, {param: cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['page_obj'].has_previous())
+
     def test_index_cache(self):
+        """Лента берётся из кэша, пока её не инвалидирует сигнал."""
         response = self.author.get(URL_INDEX_PAGE)
         content = response.content
-        Post.objects.all().delete()
-        response_after_deletion = self.author.get(URL_INDEX_PAGE)
-        content_after_deletion = response_after_deletion.content
-        self.assertEqual(content, content_after_deletion)
+        Post.objects.update(text='Текст без сигнала save')
+        response_from_cache = self.author.get(URL_INDEX_PAGE)
+        self.assertEqual(content, response_from_cache.content)
         cache.clear()
         response_after_cache_clear = self.author.get(URL_INDEX_PAGE)
-        content_after_cache_clear = response_after_cache_clear.content
-        self.assertNotEqual(content, content_after_cache_clear)
+        self.assertNotEqual(content, response_after_cache_clear.content)
+
+    def test_feed_cache_invalidation(self):
+        """Изменения постов и групп сразу видны в закэшированных лентах."""
+        urls = [URL_INDEX_PAGE, URL_GROUP_LIST_PAGE, URL_PROFILE_PAGE]
+        for url in urls:
+            self.guest_client.get(url)
+        new_post = Post.objects.create(
+            author=PostsPagesTests.user,
+            text='Свежий пост',
+            group=PostsPagesTests.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn(new_post, response.context['page_obj'])
+        new_post.group = PostsPagesTests.group2
+        new_post.save()
+        response = self.guest_client.get(URL_GROUP_LIST_PAGE)
+        self.assertNotIn(new_post, response.context['page_obj'])
+        PostsPagesTests.group2.title = 'Новое название'
+        PostsPagesTests.group2.save()
+        response = self.guest_client.get(URL_INDEX_PAGE)
+        self.assertContains(response, 'Новое название')
+
+    def test_feed_cache_is_per_page(self):
+        """Вторая страница ленты не подменяется закэшированной первой."""
+        Post.objects.bulk_create(
+            Post(author=PostsPagesTests.user, text=f'Пост {i}')
+            for i in range(settings.POSTS_AMOUNT)
+        )
+        first_page = self.guest_client.get(URL_INDEX_PAGE)
+        second_page = self.guest_client.get(
+            URL_INDEX_PAGE,
+            {'after': first_page.context['page_obj'].paginator.next_cursor}
+        )
+        self.assertNotEqual(
+            list(first_page.context['page_obj']),
+            list(second_page.context['page_obj'])
+        )
+        self.assertEqual(len(second_page.context['page_obj']), 1)
 
     def test_unfollow(self):
         Follow.objects.create(
@@ -213,3 +322,93 @@ class PostsPagesTests(TestCase):
         self.assertEqual(len(response.context['page_obj']), 1)
         post = response.context['page_obj'][0]
         self.asserts(post)
+
+
+class FeedQueriesTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        for i in range(settings.POSTS_AMOUNT):
+            author = User.objects.create_user(username=f'author{i}')
+            Post.objects.create(
+                author=author,
+                text=f'Пост {i}',
+                group=cls.group,
+            )
+            Follow.objects.create(user=cls.user, author=author)
+        Post.objects.create(author=cls.user, text='Свой пост')
+        cls.follower = Client()
+        cls.follower.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_pages_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        cases = [
+            [URL_INDEX_PAGE, 3],
+            [SECOND_INDEX_PAGE_URL, 4],
+            [URL_GROUP_LIST_PAGE, 5],
+            [URL_PROFILE_PAGE, 9],
+            [URL_FOLLOW_INDEX_PAGE, 3],
+        ]
+        for url, budget in cases:
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    self.follower.get(url)
+
+    def test_comments_are_paginated(self):
+        """Комментарии грузятся порциями с авторами, без N+1."""
+        post = Post.objects.get(author=FeedQueriesTests.user)
+        extra = 5
+        Comment.objects.bulk_create(
+            Comment(post=post, author=FeedQueriesTests.user, text=f'К {i}')
+            for i in range(settings.COMMENTS_AMOUNT + extra)
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with self.assertMaxQueries(6):
+            response = self.follower.get(url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_AMOUNT)
+        self.assertTrue(comments.has_next())
+        more_url = (
+            reverse('posts:post_comments', kwargs={'post_id': post.pk})
+            + f'?after={comments.paginator.next_cursor}'
+        )
+        self.assertContains(response, more_url)
+        with self.assertMaxQueries(4):
+            response = self.follower.get(more_url)
+        self.assertEqual(len(response.context['comments']), extra)
+        self.assertNotContains(response, 'data-load-comments')
+
+
+class CommitInvalidationTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+
+    def test_versions_change_after_commit(self):
+        """Страница, закэшированная до COMMIT пишущей транзакции, после
+        него не читается: версия области меняется ещё раз.
+        """
+        changes = [
+            (INDEX_SCOPE, lambda: Post.objects.create(
+                author=self.author, text='Пост'
+            )),
+            (follows_scope(self.reader.pk), lambda: follows.follow(
+                self.reader, self.author
+            )),
+        ]
+        for scope, change in changes:
+            with self.subTest(scope=scope):
+                with transaction.atomic():
+                    change()
+                    before_commit = get_versions([scope])
+                self.assertNotEqual(get_versions([scope]), before_commit)
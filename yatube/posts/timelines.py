@@ -0,0 +1,132 @@
+"""Материализованные ленты подписок (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора,
+поэтому follow_index читает короткую индексированную таблицу
+вместо JOIN по всем подпискам и постам.
+"""
+from django.conf import settings
+from django.db.models import Count, F
+
+from core import jobs
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _entries(user_id, posts):
+    return [
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    ]
+
+
+def trim(user_ids):
+    """Обрезает ленты, переросшие FOLLOW_TIMELINE_SIZE."""
+    size = settings.FOLLOW_TIMELINE_SIZE
+    overflowing = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=size)
+        .values_list('user_id', flat=True)
+    )
+    for user_id in overflowing:
+        timeline = TimelineEntry.objects.filter(user_id=user_id)
+        keep = timeline.order_by('-pub_date', '-post_id').values_list(
+            'id', flat=True
+        )[:size]
+        timeline.exclude(id__in=list(keep)).delete()
+
+
+def fan_out(post):
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+@jobs.register('posts.fan_out')
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        fan_out(post)
+
+
+def schedule_fan_out(post):
+    jobs.enqueue('posts.fan_out', post_id=post.pk)
+
+
+def backfill(user_id, author_ids):
+    """Добавляет в ленту свежие посты авторов, на которых подписался."""
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.FOLLOW_TIMELINE_SIZE]
+    )
+    TimelineEntry.objects.bulk_create(
+        _entries(user_id, posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    """Пересобирает все ленты по Follow и Post. Возвращает число лент."""
+    TimelineEntry.objects.all().delete()
+    user_ids = Follow.objects.values_list('user_id', flat=True).distinct()
+    built = 0
+    for user_id in list(user_ids):
+        posts = (
+            Post.objects.filter(author__following__user_id=user_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pk', 'pub_date')[:settings.FOLLOW_TIMELINE_SIZE]
+        )
+        TimelineEntry.objects.bulk_create(
+            _entries(user_id, posts), batch_size=BATCH_SIZE
+        )
+        built += 1
+    return built
+
+
+# Поля ключа курсора ленты подписок (posts.utils.CursorPaginator).
+CURSOR_FIELDS = {'date_field': 'feed_date', 'key_field': 'feed_post'}
+
+
+def follow_feed(user):
+    """Посты ленты подписок пользователя.
+
+    Ключ страницы — аннотации feed_date и feed_post. В материализованной
+    ленте это колонки posts_timelineentry, поэтому страница читается
+    прямо из индекса (user, -pub_date, -post) без сортировки постов.
+    """
+    if settings.FOLLOW_TIMELINE:
+        posts = Post.objects.for_feed().filter(
+            timeline_entries__user=user
+        ).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post_id'),
+        )
+    else:
+        posts = Post.objects.for_feed().filter(
+            author__following__user=user
+        ).annotate(feed_date=F('pub_date'), feed_post=F('pk'))
+    return posts.order_by('-feed_date', '-feed_post')
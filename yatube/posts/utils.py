@@ -1,10 +1,176 @@
+import base64
+import binascii
+from datetime import datetime, timezone
+
 from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+from . import cache as feed_cache
+from . import snapshots
+from .models import Comment
+
+CURSOR_AFTER = 'after'
+CURSOR_BEFORE = 'before'
+# Первичные ключи — знаковые 64-битные целые (SQLite INTEGER, bigint).
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (дата, id) или None для битого курсора."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().rsplit('|', 1)
+        value, pk = datetime.fromisoformat(value), int(pk)
+        # Иначе запрос упадёт на сравнении с pub_date, на переводе даты
+        # у границы диапазона в UTC или на переполнении int.
+        if value.tzinfo is None or not 0 < pk <= MAX_PK:
+            return None
+        value = value.astimezone(timezone.utc)
+    except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError):
+        return None
+    return value, pk
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (дата, id) без COUNT(*) и OFFSET.
+
+    Соседние страницы адресуются курсором — датой и id крайней записи,
+    поэтому стоимость запроса не зависит от глубины страницы.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 key_field='pk'):
+        super().__init__(object_list, per_page)
+        self.date_field = date_field
+        self.key_field = key_field
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def _cursor_for(self, obj):
+        return encode_cursor(
+            getattr(obj, self.date_field), getattr(obj, self.key_field)
+        )
+
+    def get_page(self, after=None, before=None):
+        cursor = decode_cursor(before)
+        backward = cursor is not None
+        if not backward:
+            cursor = decode_cursor(after)
+        queryset = self.object_list
+        if cursor is not None:
+            value, pk = cursor
+            lookup = 'gt' if backward else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.date_field}__{lookup}': value})
+                | Q(**{
+                    self.date_field: value,
+                    f'{self.key_field}__{lookup}': pk,
+                })
+            )
+        if backward:
+            ordering = (self.date_field, self.key_field)
+        else:
+            ordering = (f'-{self.date_field}', f'-{self.key_field}')
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and cursor is not None:
+            return self.get_page()
+        if backward:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = cursor is not None, has_more
+        if rows:
+            self.previous_cursor = (
+                self._cursor_for(rows[0]) if has_previous else None
+            )
+            self.next_cursor = self._cursor_for(rows[-1]) if has_next else None
+        number = 2 if has_previous else 1
+        self._num_pages = number + 1 if has_next else number
+        return Page(rows, number, self)
+
+
+def paginate(queryset, request, **cursor_fields):
+    """Старые ссылки ?page=N обслуживает обычный Paginator,
+    всё остальное — курсорная пагинация (cursor_fields — поля ключа
+    CursorPaginator).
+    """
+    if 'page' in request.GET:
+        paginator = Paginator(queryset, settings.POSTS_AMOUNT)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(
+        queryset, settings.POSTS_AMOUNT, **cursor_fields
+    )
+    return paginator.get_page(
+        after=request.GET.get(CURSOR_AFTER),
+        before=request.GET.get(CURSOR_BEFORE),
+    )
+
+
+def paginate_comments(post_id, request):
+    """Порция комментариев поста после курсора ?after=."""
+    paginator = CursorPaginator(
+        Comment.objects.for_list().filter(post_id=post_id),
+        settings.COMMENTS_AMOUNT,
+        date_field='created',
+    )
+    return paginator.get_page(after=request.GET.get(CURSOR_AFTER))
+
+
+def _paginator_state(paginator):
+    if isinstance(paginator, CursorPaginator):
+        return {
+            name: getattr(paginator, name)
+            for name in ('next_cursor', 'previous_cursor', '_num_pages')
+        }
+    return {'count': paginator.count}
 
-from django.core.paginator import Paginator
 
+def get_page_context(queryset, request, cache_scope=None,
+                     **cursor_fields):
+    """Страница ленты; с cache_scope — через кэш лент этой области.
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.POSTS_AMOUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    Посты закэшированной ленты — снимки PostSnapshot, а не Post.
+    """
+    if cache_scope is None:
+        return paginate(queryset, request, **cursor_fields)
+    params = '&'.join(
+        f'{name}={request.GET[name]}'
+        for name in ('page', CURSOR_AFTER, CURSOR_BEFORE)
+        if name in request.GET
+    )
+    key = feed_cache.page_key(cache_scope, params)
+    cached = feed_cache.get_page(key)
+    if cached is not None:
+        is_cursor, data, number, state = cached
+        paginator_class = CursorPaginator if is_cursor else Paginator
+        paginator = paginator_class(queryset, settings.POSTS_AMOUNT)
+        paginator.__dict__.update(state)
+        return Page(snapshots.loads(data), number, paginator)
+    page = paginate(queryset, request, **cursor_fields)
+    page.object_list = [
+        snapshots.PostSnapshot.from_post(post) for post in page.object_list
+    ]
+    feed_cache.set_page(key, (
+        isinstance(page.paginator, CursorPaginator),
+        snapshots.dumps(page.object_list),
+        page.number,
+        _paginator_state(page.paginator),
+    ))
+    return page
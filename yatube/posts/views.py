@@ -1,22 +1,71 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
 
+from core.replica import read_from_replica
+from core.uploadhandlers import get_upload_errors
+
+from .cache import (
+    INDEX_SCOPE, author_scope, group_scope, post_scope, replica_versions,
+    stats_scope
+)
+from .conditional import conditional
+from .counters import get_stats
+from .follows import follow, get_follows, unfollow
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_page_context
+from .models import Group, Post, User
+from .pagecache import cache_anonymous_page
+from .search import SearchResults
+from .timelines import CURSOR_FIELDS, follow_feed
+from .utils import get_page_context, paginate_comments
+
+
+def _group_scopes(slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return group_id and [group_scope(group_id)]
+
+
+def _profile_scopes(username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return author_id and [author_scope(author_id), stats_scope(author_id)]
+
 
+def _post_scopes(post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    return author_id and [post_scope(post_id), stats_scope(author_id)]
 
+
+@read_from_replica(versions=replica_versions(lambda: [INDEX_SCOPE]))
+@conditional(lambda: [INDEX_SCOPE])
+@cache_anonymous_page(lambda: [INDEX_SCOPE])
 def index(request):
-    page_obj = get_page_context(Post.objects.all(), request)
+    page_obj = get_page_context(
+        Post.objects.for_feed(), request, cache_scope=INDEX_SCOPE
+    )
     context = {
         'page_obj': page_obj
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica(versions=replica_versions(_group_scopes))
+@conditional(_group_scopes)
+@cache_anonymous_page(_group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    page_obj = get_page_context(group.posts.all(), request)
+    page_obj = get_page_context(
+        group.posts.for_feed(), request, cache_scope=group_scope(group.pk)
+    )
     context = {
         'group': group,
         'page_obj': page_obj
@@ -24,35 +73,71 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica(versions=replica_versions(_profile_scopes))
+@conditional(_profile_scopes)
+@cache_anonymous_page(_profile_scopes)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = get_page_context(post_list, request)
-    following = (
-        request.user.is_authenticated and request.user != username
-        and Follow.objects.filter(author=author, user=request.user).exists()
+    page_obj = get_page_context(
+        author.posts.for_feed(), request, cache_scope=author_scope(author.pk)
     )
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': page_obj,
-        'following': following,
+        'following': author in get_follows(request),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), settings.POSTS_AMOUNT)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'page_query': f'{urlencode({"q": query})}&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@read_from_replica(versions=replica_versions(_post_scopes))
+@conditional(_post_scopes)
+@cache_anonymous_page(_post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
     form = CommentForm(request.POST)
     context = {
         'post': post,
+        'author_stats': get_stats(post.author),
         'form': form,
+        'comments': paginate_comments(post.pk, request),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_from_replica
+def post_comments(request, post_id):
+    """HTML следующей порции комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    context = {
+        'post': post,
+        'comments': paginate_comments(post.pk, request),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
-    form = PostForm(request.POST or None, files=request.FILES or None,)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        upload_errors=get_upload_errors(request),
+    )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
     post = form.save(commit=False)
@@ -71,11 +156,13 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=get_upload_errors(request),
     )
 
     if form.is_valid():
-        form.save()
+        # comments_count меняют только счётчики, не форма.
+        form.save(commit=False).save(update_fields=form.Meta.fields)
         return redirect('posts:post_detail', post.pk)
 
     return render(
@@ -86,6 +173,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -97,12 +185,12 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_from_replica
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
+    page_obj = get_page_context(
+        follow_feed(request.user), request, **CURSOR_FIELDS
     )
-    page_obj = get_page_context(posts, request)
     context = {
         'page_obj': page_obj
     }
@@ -111,18 +199,13 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    user = request.user
-    author = get_object_or_404(User, username=username)
-    if user != author and not Follow.objects.filter(
-        user=user, author=author
-    ).exists():
-        Follow.objects.create(user=user, author=author)
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    follow(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
-        Follow, user=request.user, author__username=username
-    ).delete()
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    unfollow(request.user, author)
     return redirect('posts:profile', username=username)
@@ -47,7 +47,13 @@ INSTALLED_APPS = [
     'sorl.thumbnail',
 ]
 
+# Время отрисовки каждого шаблона и include на /admin/perf/ и в команде
+# profile_templates. Добавляет накладные расходы на каждый шаблон.
+PERF_TEMPLATE_PROFILE = bool(int(os.getenv('PERF_TEMPLATE_PROFILE', 0)))
+
 MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,18 +68,29 @@ ROOT_URLCONF = 'yatube.urls'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Скомпилированные шаблоны (includes/post.html рисуется десяток раз
+    # на странице) живут в памяти процесса до перезапуска.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.follows',
             ],
         },
     },
@@ -92,6 +109,44 @@ DATABASES = {
     }
 }
 
+# Профиль SQLite для нагрузки, по умолчанию включён вне DEBUG: журнал
+# WAL (чтение не ждёт записи), ожидание блокировки вместо ошибки
+# «database is locked» и соединение на поток вместо соединения на запрос.
+# PRAGMA выполняет core.db.apply_sqlite_pragmas для каждого соединения.
+SQLITE_TUNING = bool(int(os.getenv('SQLITE_TUNING', int(not DEBUG))))
+SQLITE_PRAGMAS = {}
+if SQLITE_TUNING:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        # sqlite3.connect(timeout=...): busy timeout, секунд.
+        'OPTIONS': {'timeout': 20},
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        # В WAL NORMAL не теряет целостность, лишь последние транзакции
+        # при отключении питания.
+        'synchronous': 'normal',
+        # Отрицательное значение — размер в КиБ: 64 МиБ страниц в памяти.
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'memory',
+    }
+
+# Реплика для чтения лент: копия основной базы, которую обновляет
+# python manage.py sync_replica. Включается переменной DB_REPLICA_NAME.
+DATABASE_REPLICA = None
+if os.getenv('DB_REPLICA_NAME'):
+    DATABASE_REPLICA = 'replica'
+    DATABASES[DATABASE_REPLICA] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+# Сколько секунд писавший клиент читает из основной базы.
+REPLICA_STICKY_SECONDS = 30
+REPLICA_PIN_COOKIE = 'primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -135,8 +190,15 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь core.jobs (core.mail), а доставляет их
+# EMAIL_QUEUE_BACKEND — по умолчанию движок filebased.EmailBackend.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_QUEUE_BACKEND = os.getenv(
+    'EMAIL_QUEUE_BACKEND', 'django.core.mail.backends.filebased.EmailBackend'
+)
+# Для EMAIL_QUEUE_BACKEND=django.core.mail.backends.smtp.EmailBackend.
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -145,12 +207,91 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл
+# по частям, больше FILE_UPLOAD_MAX_SIZE отбрасываются не дочитанными.
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.MaxSizeUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+# Кэш выбирается переменной окружения CACHE_BACKEND. LocMemCache
+# у каждого процесса свой, поэтому при нескольких воркерах gunicorn
+# нужен общий кэш: file, db (python manage.py createcachetable)
+# или memcached (pip install python-memcached).
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': 'yatube',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'db': 'yatube_cache',
+    'memcached': '127.0.0.1:11211',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]
+        ),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'yatube'),
+        # Увеличение CACHE_VERSION разом отбрасывает все старые ключи.
+        'VERSION': int(os.getenv('CACHE_VERSION', 1)),
+        'TIMEOUT': 300,
     }
 }
 
+THUMBNAIL_KEY_PREFIX = 'sorl-thumbnail'
+
+# Миниатюры, которые заранее готовятся для каждой картинки поста.
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Картинки с большим числом пикселей отклоняются по заголовку, до
+# декодирования. Оригиналы крупнее POST_IMAGE_MAX_SIDE по большей
+# стороне уменьшаются и вместе с остальными очищаются от EXIF.
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2560
+
 POSTS_AMOUNT = 10
+# Комментариев на странице поста и в каждой подгрузке.
+COMMENTS_AMOUNT = 20
+
+# Движок поиска: fts5 (SQLite FTS5), python (таблица SearchTerm) или
+# auto — FTS5, если миграция смогла создать таблицу posts_search.
+# После смены движка выполните python manage.py rebuild_search_index.
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+
+# Время жизни страницы ленты в кэше, секунд. Свежесть обеспечивают
+# сигналы Post и Group, таймаут лишь вытесняет неиспользуемые ключи.
+FEED_CACHE_TIMEOUT = 60 * 10
+# Время жизни готовой гостевой страницы (posts.pagecache), секунд.
+# Правки данных сбрасывают её сразу, таймаут ограничивает лишь
+# устаревание шаблонов после выкладки без смены CACHE_VERSION.
+PAGE_CACHE_TIMEOUT = 60 * 10
 
 SEVERAL_TEXT_CHARACTERS = 15
+
+# Очередь отложенных задач core.jobs: local — в процессе запроса
+# (фоновые задачи в пуле из JOBS_THREADS потоков), db — в таблице
+# core_job, которую разбирает python manage.py run_worker.
+JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'local')
+JOBS_THREADS = 2
+# Пауза перед повтором упавшей задачи, секунд; удваивается с каждой
+# попыткой.
+JOBS_RETRY_DELAY = 10
+# Задачи воркера, не отчитавшегося за это время, возвращаются в очередь.
+JOBS_STALE_AFTER = 60 * 10
+
+# Материализованная лента подписок (fan-out on write).
+# После включения выполните: python manage.py rebuild_timelines
+FOLLOW_TIMELINE = bool(int(os.getenv('FOLLOW_TIMELINE', 0)))
+FOLLOW_TIMELINE_SIZE = 500